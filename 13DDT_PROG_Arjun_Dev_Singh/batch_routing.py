@@ -0,0 +1,182 @@
+"""
+Batch routing for scripts (e.g. a whole day's timetable).
+
+route_batch takes a list of (from, to) pairs, where each end is a house
+name or a normalized (x, y) point. It removes duplicate pairs (a pair and
+its reverse count as one search) and answers known house pairs from the
+route table. The remaining searches are spread over a ProcessPoolExecutor.
+Workers open the walkway mask from data/cache as a read-only
+memory-mapped array and search it in place, so the grid is shared
+between processes and never pickled or copied. With closures in effect
+the closed mask is saved there first (content-addressed) for the same
+reason.
+
+Results come back in input order, one dict per pair:
+
+    {"from": ..., "to": ..., "path": [(x, y), ...], "dist": px or None,
+     "seconds": search time, "source": "search" | "table" | "duplicate" | "disconnected"}
+
+A "duplicate" entry shares the path of the first pair it repeats and
+reports 0 seconds, so summing "seconds" counts every search once.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import os
+import time
+
+import numpy as np
+
+from walkways import (
+    CACHE_DIR, image_hash, load_walk_mask, mask_digest, mask_path, routing_mask,
+    same_component, snap_many,
+)
+from route_table import lookup_route
+from pathfinding import search
+
+_WORKER_MASK = None
+
+
+# ------------------ Worker ------------------
+def _init_worker(mask_file, mask=None):
+    """Open the shared mask once per worker process (memory-mapped, not copied)."""
+    global _WORKER_MASK
+    _WORKER_MASK = np.load(mask_file, mmap_mode="r") if mask_file else mask
+
+
+def _shared_mask_file(mask, plain_path):
+    """
+    .npy file workers can memory-map for this mask: the cached plain mask
+    if no closures apply, else the closed mask saved under data/cache.
+    Returns None if it can't be written.
+    """
+    if plain_path is not None and plain_path.exists():
+        return plain_path
+    path = CACHE_DIR / f"closed_{mask_digest(mask)[:16]}.npy"
+    if path.exists():
+        return path
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.stem + f".{os.getpid()}.tmp.npy")
+        np.save(tmp, np.asarray(mask))
+        os.replace(tmp, path)
+        return path
+    except OSError:
+        return None
+
+
+def _search_job(job):
+    """Run one grid search in a worker; returns (cells, cost, seconds)."""
+    s, t, engine, diagonal, epsilon = job
+    t0 = time.perf_counter()
+    cells, cost = search(_WORKER_MASK, s, t, engine, diagonal, epsilon=epsilon)
+    return cells, cost, time.perf_counter() - t0
+
+
+# ------------------ Batch API ------------------
+def route_batch(
+    pairs,
+    markers_norm: dict,
+    pil_image,
+    grid_scale: int = 3,
+    sat_max: int = 40,
+    val_min: int = 200,
+    engine: str = "astar",
+    diagonal: bool = False,
+    workers: int = None,
+    use_table: bool = True,
+    epsilon: float = 1.0,
+):
+    """
+    Route many (from, to) pairs at once.
+
+    Args:
+        pairs (list): (from, to) tuples; each end is a house name from
+            markers_norm or a normalized (x, y) point.
+        workers (int): Process count (default: CPU count). 0 runs every
+            search in this process, which is handy for debugging.
+        epsilon (float): Weighted A* factor; see pathfinding.search.
+
+    Returns:
+        list[dict]: One result per input pair, in the same order.
+    """
+    mask = routing_mask(pil_image, grid_scale, sat_max, val_min)
+    size = pil_image.size
+    w0, h0 = size
+
+    def point(end):
+        return tuple(markers_norm[end]) if isinstance(end, str) else tuple(end)
+
+    # Snap every distinct end in one pass
+    ends = list(dict.fromkeys(point(end) for pair in pairs for end in pair))
+    cells = dict(zip(ends, snap_many(mask, ends, size, grid_scale)))
+
+    results = [None] * len(pairs)
+    unique = {}   # unordered pair key -> index of first result
+    jobs = {}     # index -> (s, t, engine, diagonal, epsilon)
+
+    for i, (a, b) in enumerate(pairs):
+        pa, pb = point(a), point(b)
+        res = {"from": a, "to": b, "path": [], "dist": None, "seconds": 0.0}
+        results[i] = res
+
+        key = frozenset((pa, pb)) if pa != pb else (pa,)
+        if key in unique:
+            res["source"] = "duplicate"
+            continue
+        unique[key] = i
+
+        if use_table and engine == "astar" and not diagonal \
+                and isinstance(a, str) and isinstance(b, str):
+            t0 = time.perf_counter()
+            hit = lookup_route(a, b, markers_norm, pil_image, grid_scale, sat_max, val_min)
+            if hit is not None:
+                res["path"], res["dist"] = hit
+                res["seconds"] = time.perf_counter() - t0
+                res["source"] = "table"
+                continue
+
+        s, t = cells[pa], cells[pb]
+        if s != t and not same_component(mask, s, t):
+            res["source"] = "disconnected"
+            continue
+        res["source"] = "search"
+        jobs[i] = (s, t, engine, diagonal, epsilon)
+
+    # Fan the unique searches out over worker processes
+    order = list(jobs)
+    if workers == 0 or len(order) <= 1:
+        _init_worker(None, mask)
+        outputs = [_search_job(jobs[i]) for i in order]
+    else:
+        # The cached file is the mask before closures; only share it if none apply
+        plain = mask is load_walk_mask(pil_image, grid_scale, sat_max, val_min)
+        path = _shared_mask_file(
+            mask, mask_path(image_hash(pil_image), grid_scale, sat_max, val_min) if plain else None)
+        init = (str(path),) if path is not None else (None, np.asarray(mask))
+        n = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=min(n, len(order)),
+                                 initializer=_init_worker, initargs=init) as pool:
+            outputs = list(pool.map(_search_job, [jobs[i] for i in order]))
+
+    for i, (cells, cost, seconds) in zip(order, outputs):
+        res = results[i]
+        res["seconds"] = seconds
+        if cells:
+            path = [(x * grid_scale / w0, y * grid_scale / h0) for x, y in cells]
+            path[0] = point(res["from"])
+            path[-1] = point(res["to"])
+            res["path"], res["dist"] = path, cost * grid_scale
+
+    # Copy shared results onto duplicates, reversing where needed
+    for i, (a, b) in enumerate(pairs):
+        res = results[i]
+        if res["source"] != "duplicate":
+            continue
+        pa, pb = point(a), point(b)
+        first = results[unique[frozenset((pa, pb)) if pa != pb else (pa,)]]
+        path = list(first["path"])
+        if path and point(first["from"]) != pa:
+            path.reverse()
+        res["path"], res["dist"] = path, first["dist"]
+
+    return results
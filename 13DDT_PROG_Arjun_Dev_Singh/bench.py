@@ -0,0 +1,137 @@
+"""
+Headless routing benchmark.
+
+Routes every pair of houses with raster_route_walkways (route table off)
+for each grid_scale and engine, without starting the Tk app, and prints
+a JSON report: wall time, nodes expanded, peak traced memory and path
+length per pair, plus totals per (grid_scale, engine). Save reports from
+two versions and compare them to catch routing regressions.
+
+    python bench.py --scales 2 3 4 --engines astar jps --out bench.json
+"""
+
+from itertools import combinations
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+import tracemalloc
+
+from PIL import Image
+
+from pathfinding import ENGINES
+from utils import find_map_image, house_components, load_markers_norm, raster_route_walkways, MAP_PATH
+from walkways import image_hash, load_walk_mask
+
+
+def path_length_px(path, image_size) -> float:
+    """Length of a normalized polyline in image pixels."""
+    w0, h0 = image_size
+    return sum(math.hypot((bx - ax) * w0, (by - ay) * h0)
+               for (ax, ay), (bx, by) in zip(path, path[1:]))
+
+
+def run_pair(a, b, markers_norm, pil_image, grid_scale, engine, diagonal, epsilon, memory):
+    """Route one pair; time it untraced, then (optionally) again under tracemalloc."""
+    stats = {}
+    t0 = time.perf_counter()
+    path = raster_route_walkways(a, b, markers_norm, pil_image, grid_scale, use_table=False,
+                                 engine=engine, diagonal=diagonal, stats=stats, epsilon=epsilon)
+    seconds = time.perf_counter() - t0
+
+    peak = None
+    if memory:
+        tracemalloc.start()
+        raster_route_walkways(a, b, markers_norm, pil_image, grid_scale, use_table=False,
+                              engine=engine, diagonal=diagonal, epsilon=epsilon)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        "from": a, "to": b, "grid_scale": grid_scale, "engine": engine,
+        "seconds": round(seconds, 6),
+        "expanded": stats.get("expanded", 0),
+        "peak_kib": None if peak is None else round(peak / 1024, 1),
+        "length_px": round(path_length_px(path, pil_image.size), 2) if path else None,
+        "points": len(path),
+    }
+
+
+def run(scales, engines, diagonal=False, epsilon=1.0, memory=True, markers_norm=None, pil_image=None):
+    """Benchmark every house pair; returns the report dict."""
+    markers_norm = markers_norm or load_markers_norm()
+    pil_image = pil_image or Image.open(find_map_image() or MAP_PATH)
+    pairs = list(combinations(sorted(markers_norm), 2))
+    if not pairs:
+        raise ValueError("Benchmark needs at least 2 markers (check data/markers.json)")
+
+    results, summary = [], []
+    for gs in scales:
+        t0 = time.perf_counter()
+        load_walk_mask(pil_image, gs)  # Build/load outside the timed searches
+        mask_seconds = time.perf_counter() - t0
+        # Warm up on a connected pair: a disconnected one is rejected before
+        # any engine runs, leaving its graph build inside the first timed pair
+        comp = house_components(markers_norm, pil_image, gs)
+        warm = next(((a, b) for a, b in pairs if comp[a] and comp[a] == comp[b]), None)
+        if warm is None:
+            print(f"g{gs}: no connected house pair; engine build time is not excluded", file=sys.stderr)
+        for engine in engines:
+            if warm is not None:
+                # One untimed route builds per-mask caches (jump tables, HPA*, skeleton)
+                raster_route_walkways(*warm, markers_norm, pil_image, gs, use_table=False,
+                                      engine=engine, diagonal=diagonal, epsilon=epsilon)
+            rows = [run_pair(a, b, markers_norm, pil_image, gs, engine, diagonal, epsilon, memory)
+                    for a, b in pairs]
+            results.extend(rows)
+            peaks = [r["peak_kib"] for r in rows if r["peak_kib"] is not None]
+            summary.append({
+                "grid_scale": gs, "engine": engine,
+                "mask_seconds": round(mask_seconds, 6),
+                "seconds": round(sum(r["seconds"] for r in rows), 6),
+                "expanded": sum(r["expanded"] for r in rows),
+                "max_peak_kib": max(peaks) if peaks else None,
+                "reachable": sum(r["length_px"] is not None for r in rows),
+                "pairs": len(rows),
+            })
+
+    return {
+        "image": image_hash(pil_image)[:16],
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {"scales": list(scales), "engines": list(engines),
+                   "diagonal": diagonal, "epsilon": epsilon},
+        "summary": summary,
+        "results": results,
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark walkway routing over all house pairs.")
+    ap.add_argument("--scales", type=int, nargs="+", default=[2, 3, 4], help="grid_scale values")
+    ap.add_argument("--engines", nargs="+", default=["astar"], choices=sorted(ENGINES))
+    ap.add_argument("--diagonal", action="store_true", help="8-connected grid")
+    ap.add_argument("--epsilon", type=float, default=1.0, help="weighted A* factor")
+    ap.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    ap.add_argument("--out", help="write JSON here instead of stdout")
+    args = ap.parse_args(argv)
+
+    try:
+        report = run(args.scales, args.engines, args.diagonal, args.epsilon, not args.no_memory)
+    except ValueError as e:
+        sys.exit(f"bench: {e}")
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+        for row in report["summary"]:
+            print(f"g{row['grid_scale']} {row['engine']}: {row['seconds']:.3f}s, "
+                  f"{row['expanded']} expanded, peak {row['max_peak_kib']} KiB", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
 from db import get_db
 from utils import CODE_PREFIX_TO_HOUSE, get_building_key
+from planner import class_house
 
 # Houses available for selection
 HOUSES = ["Batten", "Hillary", "Kupe", "Mansfield",
@@ -11,7 +12,7 @@ HOUSES = ["Batten", "Hillary", "Kupe", "Mansfield",
 class ClassesWindow(tk.Toplevel):
     """Window for viewing and managing classes."""
 
-    def __init__(self, parent, user, markers_norm, on_route_callback):
+    def __init__(self, parent, user, markers_norm, on_route_callback, on_plan_callback=None):
         super().__init__(parent)
         self.title("Classes")
         self.geometry("720x460")
@@ -20,6 +21,7 @@ class ClassesWindow(tk.Toplevel):
         self.user = user
         self.markers_norm = markers_norm
         self.on_route = on_route_callback
+        self.on_plan = on_plan_callback  # on_plan(start, houses, optimise) for multi-stop days
 
         # Treeview for class list
         cols = ("title", "teacher", "code", "house", "notes")
@@ -58,19 +60,22 @@ class ClassesWindow(tk.Toplevel):
                                      r["house"] or "", r["notes"] or ""))
 
     def _route_selected(self):
-        """Route user from chosen house to selected class house."""
+        """Route user from chosen house to selected class house(s)."""
         sel = self.tree.selection()
         if not sel:
             messagebox.showwarning("Select a class", "Pick a class to route to.")
             return
+        if len(sel) > 1 and self.on_plan:
+            self._route_day(sel)
+            return
         cur = get_db().cursor()
         cur.execute("SELECT * FROM classes WHERE id=?", (sel[0],))
         r = cur.fetchone()
         if not r:
             messagebox.showerror("Error", "Could not load class row.")
             return
-        dest_house = (r["house"] or "").strip() or CODE_PREFIX_TO_HOUSE.get((r["code"] or "").strip().upper()[:1], "")
-        if not dest_house or dest_house not in self.markers_norm:
+        dest_house = class_house(r, self.markers_norm)
+        if not dest_house:
             messagebox.showerror("Missing house", "This class has no valid house set.")
             return
         start = simpledialog.askstring("From where?", "Enter your starting house (e.g., Kupe):", parent=self)
@@ -82,6 +87,31 @@ class ClassesWindow(tk.Toplevel):
             return
         self.on_route(start_key, dest_house)
 
+    def _route_day(self, sel):
+        """Chain several selected classes (in table order) into one route."""
+        cur = get_db().cursor()
+        houses = []
+        for iid in sel:
+            cur.execute("SELECT * FROM classes WHERE id=?", (iid,))
+            r = cur.fetchone()
+            house = class_house(r, self.markers_norm) if r else None
+            if not house:
+                title = r["title"] if r else iid
+                messagebox.showerror("Missing house", f"'{title}' has no valid house set.")
+                return
+            houses.append(house)
+        start = simpledialog.askstring("From where?", "Enter your starting house (e.g., Kupe):", parent=self)
+        if not start:
+            return
+        start_key = get_building_key(start, self.markers_norm)
+        if not start_key:
+            messagebox.showerror("Invalid house", "Unknown starting house name.")
+            return
+        optimise = messagebox.askyesno(
+            "Order", "Free periods today?\nReorder these classes for the shortest walk?", parent=self
+        )
+        self.on_plan(start_key, houses, optimise)
+
     def _add(self):
         self._edit_dialog(None)
 
@@ -0,0 +1,219 @@
+"""
+Per-house distance fields over the walkway grid.
+
+One breadth-first flood from each house pin fills a predecessor-direction
+array (one byte per cell) for the whole grid. A route from that house to
+any cell (another house, or a room code from codes.json) is then just a
+backtrack, and its length is the number of steps, so routing to hundreds
+of rooms costs one flood per house, not one A* search per room. Fields
+are saved as compressed .npz files in data/cache. raster_route_walkways
+uses a field that is already cached for house pairs the route table
+can't answer, but never floods one itself (a search is cheaper, and can
+be cancelled).
+"""
+
+import hashlib
+
+import numpy as np
+
+from walkways import (
+    CACHE_DIR, closures_digest, image_hash, load_closures, routing_mask, snap_many, snap_norm,
+)
+
+NO_PRED = 255  # pred value for the start cell and unreached cells
+
+_FIELDS = {}  # key -> (pred uint8 array, start cell)
+
+
+# ------------------ Flood ------------------
+def _offsets(W: int):
+    """Flat-index offsets for the 4 neighbour directions (E, W, S, N)."""
+    return (1, -1, W, -W)
+
+
+def flood_field(mask, start):
+    """
+    Breadth-first flood from a start cell over a walkable mask.
+
+    Args:
+        mask (np.ndarray): bool walkable grid, indexed mask[y, x].
+        start (tuple): (x, y) start cell; should be walkable.
+
+    Returns:
+        np.ndarray: uint8 pred array shaped like mask; the direction index
+            used to enter each cell, NO_PRED for the start and for cells
+            the flood never reached.
+    """
+    H, W = mask.shape
+    walk = mask.ravel()
+    col = np.tile(np.arange(W, dtype=np.int32), H)
+    seen = np.zeros(H * W, dtype=bool)
+    pred = np.full(H * W, NO_PRED, dtype=np.uint8)
+
+    sx, sy = start
+    if not (0 <= sx < W and 0 <= sy < H) or not walk[sy * W + sx]:
+        return pred.reshape(H, W)
+
+    offs = _offsets(W)
+    frontier = np.array([sy * W + sx], dtype=np.int64)
+    seen[frontier] = True
+    while frontier.size:
+        reached = []
+        for k, off in enumerate(offs):
+            # Drop neighbours that would wrap across a row edge
+            if off == 1:
+                src = frontier[col[frontier] < W - 1]
+            elif off == -1:
+                src = frontier[col[frontier] > 0]
+            else:
+                src = frontier
+            nb = src + off
+            ok = (nb >= 0) & (nb < H * W)
+            nb = nb[ok]
+            nb = nb[walk[nb] & ~seen[nb]]
+            seen[nb] = True
+            pred[nb] = k
+            reached.append(nb)
+        frontier = np.concatenate(reached)
+    return pred.reshape(H, W)
+
+
+def reached(pred, start, cell) -> bool:
+    """True if the flood from start got to cell."""
+    H, W = pred.shape
+    x, y = cell
+    return 0 <= x < W and 0 <= y < H and (pred[y, x] != NO_PRED or tuple(cell) == tuple(start))
+
+
+def backtrack(pred, cell):
+    """Walk predecessor directions from a cell back to the flood start."""
+    H, W = pred.shape
+    offs = _offsets(W)
+    flat = pred.ravel()
+    i = cell[1] * W + cell[0]
+    cells = [cell]
+    while flat[i] != NO_PRED:
+        i -= offs[flat[i]]
+        cells.append((i % W, i // W))
+    cells.reverse()
+    return cells
+
+
+# ------------------ Cache ------------------
+def field_key(house: str, markers_norm: dict, pil_image, grid_scale: int = 3,
+              sat_max: int = 40, val_min: int = 200) -> str:
+    """Hash of the image, routing parameters, closures and the house pin position."""
+    xn, yn = markers_norm[house]
+    raw = f"{image_hash(pil_image)}|{grid_scale}|{sat_max}|{val_min}|{house}|{xn}|{yn}"
+    closures = load_closures()
+    if closures:
+        raw += f"|{closures_digest(closures)}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def load_field(house: str, markers_norm: dict, pil_image, grid_scale: int = 3,
+               sat_max: int = 40, val_min: int = 200, flood: bool = True):
+    """
+    Get the distance field for a house, flooding only if needed.
+
+    Args:
+        flood (bool): If False, only memory and disk are tried.
+
+    Returns:
+        tuple | None: (pred, start) for the house, or None if flood is
+            False and the field isn't cached.
+    """
+    key = field_key(house, markers_norm, pil_image, grid_scale, sat_max, val_min)
+    hit = _FIELDS.get(key)
+    if hit is not None:
+        return hit
+
+    path = CACHE_DIR / f"field_{key[:16]}.npz"
+    try:
+        with np.load(path) as z:
+            hit = (z["pred"], tuple(int(v) for v in z["start"]))
+    except Exception:
+        hit = None
+
+    if hit is None and not flood:
+        return None
+    if hit is None:
+        mask = routing_mask(pil_image, grid_scale, sat_max, val_min)
+        start = snap_norm(mask, markers_norm[house], pil_image.size, grid_scale)
+        hit = (flood_field(mask, start), start)
+        try:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            np.savez_compressed(path, pred=hit[0], start=np.array(start))
+        except OSError:
+            pass
+
+    _FIELDS[key] = hit
+    return hit
+
+
+def warm_fields(markers_norm: dict, pil_image, grid_scale: int = 3,
+                sat_max: int = 40, val_min: int = 200):
+    """Flood (or load) the distance field for every house."""
+    for house in markers_norm:
+        load_field(house, markers_norm, pil_image, grid_scale, sat_max, val_min)
+
+
+# ------------------ Routing ------------------
+def route_from_house(house: str, point_norm, markers_norm: dict, pil_image,
+                     grid_scale: int = 3, sat_max: int = 40, val_min: int = 200,
+                     flood: bool = True):
+    """
+    Route from a house pin to any normalized point using its distance field.
+
+    Returns:
+        tuple | None: (path, dist) like raster_route_with_cost, with dist in
+            image pixels, or ([], None) if the point is unreachable. None
+            if flood is False and the house has no cached field.
+    """
+    hit = load_field(house, markers_norm, pil_image, grid_scale, sat_max, val_min, flood)
+    if hit is None:
+        return None
+    mask = routing_mask(pil_image, grid_scale, sat_max, val_min)
+    target = snap_norm(mask, point_norm, pil_image.size, grid_scale)
+    return _field_route(hit, target, markers_norm[house], point_norm, pil_image.size, grid_scale)
+
+
+def _field_route(field, target, start_norm, end_norm, image_size, grid_scale: int):
+    """(path, dist) from a field's start to a snapped target cell."""
+    pred, start = field
+    if not reached(pred, start, target):
+        return [], None
+    w0, h0 = image_size
+    cells = backtrack(pred, target)
+    path = [(x * grid_scale / w0, y * grid_scale / h0) for x, y in cells]
+    path[0] = tuple(start_norm)
+    path[-1] = tuple(end_norm)
+    return path, (len(cells) - 1) * grid_scale
+
+
+def route_to_codes(house: str, codes, markers_norm: dict, pil_image, codes_norm: dict,
+                   grid_scale: int = 3, sat_max: int = 40, val_min: int = 200):
+    """
+    Route from a house pin to many room codes with one field and one
+    batch snap (walkways.snap_many).
+
+    Returns:
+        dict: code -> (path, dist); ([], None) for unknown or unreachable codes.
+    """
+    field = load_field(house, markers_norm, pil_image, grid_scale, sat_max, val_min)
+    mask = routing_mask(pil_image, grid_scale, sat_max, val_min)
+    known = [c for c in codes if c.strip().upper() in codes_norm]
+    points = [codes_norm[c.strip().upper()] for c in known]
+    targets = snap_many(mask, points, pil_image.size, grid_scale)
+    out = {c: ([], None) for c in codes}
+    for code, point, target in zip(known, points, targets):
+        out[code] = _field_route(field, target, markers_norm[house], point,
+                                 pil_image.size, grid_scale)
+    return out
+
+
+def route_to_code(house: str, code: str, markers_norm: dict, pil_image, codes_norm: dict,
+                  grid_scale: int = 3, sat_max: int = 40, val_min: int = 200):
+    """Route from a house pin to a room code location (codes_norm from utils.load_codes_norm)."""
+    return route_to_codes(house, [code], markers_norm, pil_image, codes_norm,
+                          grid_scale, sat_max, val_min)[code]
@@ -0,0 +1,374 @@
+"""
+Hierarchical pathfinding (HPA*) over the walkway grid.
+
+The grid is cut into square clusters. Wherever a walkable run crosses a
+cluster border an entrance is placed (one transition for a short run,
+one at each end of a long one), and the walking distances between the
+entrances of each cluster are precomputed. That gives a small abstract
+graph that is built once per mask and saved under data/cache.
+
+A query links the start and goal cells into the abstract graph, runs A*
+over it and then refines every abstract hop with a local search inside
+a single cluster. Routes are near-optimal (usually within a few percent)
+and the cost no longer grows with the full grid size.
+
+The graph build dominates a cold run. On the shipped map at grid_scale=1
+(15 of the 28 house pairs connected) plain A* answers all pairs in about
+1 s, HPA* in about 0.2 s once the graph is cached, and building the graph
+takes about 1.5 s (3.3 s with diagonals). It pays off when the cached
+graph is reused across runs, not for a single pass.
+"""
+
+import heapq
+import math
+
+import numpy as np
+
+from walkways import CACHE_DIR, CHECK_EVERY, checkpoint, mask_digest
+
+CLUSTER_SIZE = 16
+SQRT2 = math.sqrt(2)
+
+_GRAPHS = {}  # (id(mask), size, diagonal) -> (mask, HpaGraph)
+
+
+# ------------------ Local Searches ------------------
+def _neighbours(sub, diagonal):
+    """Flat-index adjacency lists [(j, cost), ...] for a small subgrid."""
+    h, w = sub.shape
+    steps = [(1, 0, 1.0), (-1, 0, 1.0), (0, 1, 1.0), (0, -1, 1.0)]
+    if diagonal:
+        steps += [(dx, dy, SQRT2) for dx in (1, -1) for dy in (1, -1)]
+    adj = [[] for _ in range(h * w)]
+    for dx, dy, c in steps:
+        # ok[y, x]: the step from (x, y) to (x + dx, y + dy) stays open
+        ok = np.zeros((h, w), dtype=bool)
+        ys = slice(max(0, -dy), h - max(0, dy))
+        xs = slice(max(0, -dx), w - max(0, dx))
+        ok[ys, xs] = sub[ys, xs] & sub[ys.start + dy:ys.stop + dy, xs.start + dx:xs.stop + dx]
+        if dx and dy:
+            # A diagonal step is allowed only inside a fully open 2x2 block
+            ok[ys, xs] &= sub[ys, xs.start + dx:xs.stop + dx] & sub[ys.start + dy:ys.stop + dy, xs]
+        off = dy * w + dx
+        for u in np.flatnonzero(ok).tolist():
+            adj[u].append((u + off, c))
+    return adj
+
+
+def _relax(sub, sources, diagonal):
+    """
+    Distances from each source to every cell of a small subgrid.
+
+    Runs one search per source over the cluster's own cells: a BFS when
+    every step costs 1, Dijkstra when diagonals are allowed.
+
+    Args:
+        sub (np.ndarray): bool walkable subgrid.
+        sources (list): (x, y) cells in subgrid coordinates.
+        diagonal (bool): Allow diagonal steps (no corner cutting).
+
+    Returns:
+        np.ndarray: float array of shape (len(sources), h, w); inf where
+            a cell can't be reached inside the subgrid.
+    """
+    h, w = sub.shape
+    adj = _neighbours(sub, diagonal)
+    dist = np.full((len(sources), h, w), np.inf)
+    for i, (sx, sy) in enumerate(sources):
+        best = [math.inf] * (h * w)
+        best[sy * w + sx] = 0.0
+        if not diagonal:
+            layer = [sy * w + sx]
+            d = 0.0
+            while layer:
+                d += 1.0
+                nxt = []
+                for u in layer:
+                    for v, _ in adj[u]:
+                        if best[v] == math.inf:
+                            best[v] = d
+                            nxt.append(v)
+                layer = nxt
+        else:
+            frontier = [(0.0, sy * w + sx)]
+            pop, push = heapq.heappop, heapq.heappush
+            while frontier:
+                d, u = pop(frontier)
+                if d > best[u]:
+                    continue
+                for v, c in adj[u]:
+                    nd = d + c
+                    if nd < best[v]:
+                        best[v] = nd
+                        push(frontier, (nd, v))
+        dist[i] = np.reshape(best, (h, w))
+    return dist
+
+
+def _descend(dist, sub, cell, diagonal):
+    """Follow a distance field downhill from cell to its source (dist 0)."""
+    h, w = sub.shape
+    steps = [(1, 0, 1.0), (-1, 0, 1.0), (0, 1, 1.0), (0, -1, 1.0)]
+    if diagonal:
+        steps += [(dx, dy, SQRT2) for dx in (1, -1) for dy in (1, -1)]
+    x, y = cell
+    cells = [cell]
+    while dist[y, x] > 0:
+        for dx, dy, c in steps:
+            nx, ny = x + dx, y + dy
+            if not (0 <= nx < w and 0 <= ny < h) or not sub[ny, nx]:
+                continue
+            if dx and dy and not (sub[y, nx] and sub[ny, x]):
+                continue
+            if abs(dist[ny, nx] + c - dist[y, x]) < 1e-6:
+                x, y = nx, ny
+                break
+        else:
+            return None  # Shouldn't happen on a converged field
+        cells.append((x, y))
+    return cells
+
+
+# ------------------ Abstract Graph ------------------
+class HpaGraph:
+    """Entrance graph for one mask, cluster size and connectivity."""
+
+    def __init__(self, mask, size: int = CLUSTER_SIZE, diagonal: bool = False):
+        self.mask = mask
+        self.size = size
+        self.diagonal = diagonal
+        self.nodes = []        # id -> (x, y)
+        self.index = {}        # (x, y) -> id
+        self.edges = {}        # id -> {neighbour id: cost}
+        self.by_cluster = {}   # (cx, cy) -> [ids]
+
+    # ---- geometry ----
+    def cluster_of(self, cell):
+        return (cell[0] // self.size, cell[1] // self.size)
+
+    def bounds(self, cluster):
+        """(x0, y0, x1, y1) of a cluster, end-exclusive."""
+        H, W = self.mask.shape
+        x0, y0 = cluster[0] * self.size, cluster[1] * self.size
+        return x0, y0, min(W, x0 + self.size), min(H, y0 + self.size)
+
+    def sub(self, cluster):
+        x0, y0, x1, y1 = self.bounds(cluster)
+        return self.mask[y0:y1, x0:x1], x0, y0
+
+    # ---- building ----
+    def _node(self, cell):
+        i = self.index.get(cell)
+        if i is None:
+            i = len(self.nodes)
+            self.nodes.append(cell)
+            self.index[cell] = i
+            self.edges[i] = {}
+            self.by_cluster.setdefault(self.cluster_of(cell), []).append(i)
+        return i
+
+    def _link(self, a, b, cost):
+        if cost < self.edges[a].get(b, math.inf):
+            self.edges[a][b] = cost
+            self.edges[b][a] = cost
+
+    def _entrances(self, open_run, make_pair):
+        """Place transitions along one border segment."""
+        y = 0
+        n = len(open_run)
+        while y < n:
+            if not open_run[y]:
+                y += 1
+                continue
+            start = y
+            while y < n and open_run[y]:
+                y += 1
+            length = y - start
+            picks = [start + length // 2] if length < 6 else [start, y - 1]
+            for p in picks:
+                a, b = make_pair(p)
+                self._link(self._node(a), self._node(b), 1.0)
+
+    def build(self):
+        """Find entrances and precompute intra-cluster distances."""
+        H, W = self.mask.shape
+        m, size = self.mask, self.size
+
+        # Vertical borders (between cluster columns)
+        for bx in range(size, W, size):
+            for y0 in range(0, H, size):
+                y1 = min(H, y0 + size)
+                run = (m[y0:y1, bx - 1] & m[y0:y1, bx]).tolist()
+                self._entrances(run, lambda p, bx=bx, y0=y0: ((bx - 1, y0 + p), (bx, y0 + p)))
+
+        # Horizontal borders (between cluster rows)
+        for by in range(size, H, size):
+            for x0 in range(0, W, size):
+                x1 = min(W, x0 + size)
+                run = (m[by - 1, x0:x1] & m[by, x0:x1]).tolist()
+                self._entrances(run, lambda p, by=by, x0=x0: ((x0 + p, by - 1), (x0 + p, by)))
+
+        # Intra-cluster edges
+        for cluster, ids in self.by_cluster.items():
+            if len(ids) < 2:
+                continue
+            sub, x0, y0 = self.sub(cluster)
+            local = [(self.nodes[i][0] - x0, self.nodes[i][1] - y0) for i in ids]
+            # The last entrance's row is never read: its edges come from the others
+            dist = _relax(sub, local[:-1], self.diagonal)
+            for a in range(len(ids)):
+                for b in range(a + 1, len(ids)):
+                    d = dist[a, local[b][1], local[b][0]]
+                    if math.isfinite(d):
+                        self._link(ids[a], ids[b], float(d))
+        return self
+
+    # ---- persistence ----
+    def save(self, path):
+        edges = [(a, b, c) for a, nb in self.edges.items() for b, c in nb.items() if a < b]
+        np.savez(
+            path,
+            nodes=np.array(self.nodes, dtype=np.int32).reshape(-1, 2),
+            pairs=np.array([(a, b) for a, b, _ in edges], dtype=np.int32).reshape(-1, 2),
+            costs=np.array([c for _, _, c in edges], dtype=np.float64),
+        )
+
+    def load(self, path):
+        with np.load(path) as z:
+            for x, y in z["nodes"].tolist():
+                self._node((x, y))
+            for (a, b), c in zip(z["pairs"].tolist(), z["costs"].tolist()):
+                self._link(a, b, c)
+        return self
+
+
+def get_graph(mask, size: int = CLUSTER_SIZE, diagonal: bool = False) -> HpaGraph:
+    """Return the abstract graph for a mask (memory, then disk, then build)."""
+    key = (id(mask), size, diagonal)
+    hit = _GRAPHS.get(key)
+    if hit is not None and hit[0] is mask:
+        return hit[1]
+
+    path = CACHE_DIR / f"hpa_{mask_digest(mask)[:16]}_c{size}_{'d8' if diagonal else 'd4'}.npz"
+    graph = HpaGraph(mask, size, diagonal)
+    try:
+        graph.load(path)
+    except Exception:
+        graph = HpaGraph(mask, size, diagonal).build()
+        try:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            graph.save(path)
+        except OSError:
+            pass
+
+    _GRAPHS[key] = (mask, graph)
+    return graph
+
+
+# ------------------ Query ------------------
+def hpa_search(mask, s, t, diagonal=False, stats=None, cancel=None,
+               size: int = CLUSTER_SIZE):
+    """HPA* engine with the same interface as pathfinding.astar."""
+    if s == t:
+        return [s], 0
+    H, W = mask.shape
+    if not all(0 <= c[0] < W and 0 <= c[1] < H and mask[c[1], c[0]] for c in (s, t)):
+        return [], None
+
+    graph = get_graph(mask, size, diagonal)
+    START, GOAL = -1, -2
+
+    def attach(cell):
+        """Distances from a cell to the entrances of its own cluster."""
+        sub, x0, y0 = graph.sub(graph.cluster_of(cell))
+        dist = _relax(sub, [(cell[0] - x0, cell[1] - y0)], diagonal)[0]
+        links = {}
+        for i in graph.by_cluster.get(graph.cluster_of(cell), []):
+            nx, ny = graph.nodes[i]
+            d = dist[ny - y0, nx - x0]
+            if math.isfinite(d):
+                links[i] = float(d)
+        return links, dist, x0, y0
+
+    links_s, dist_s, sx0, sy0 = attach(s)
+    links_t, dist_t, tx0, ty0 = attach(t)
+    direct = None
+    if graph.cluster_of(s) == graph.cluster_of(t):
+        d = dist_s[t[1] - sy0, t[0] - sx0]
+        if math.isfinite(d):
+            direct = float(d)
+
+    def pos(u):
+        return s if u == START else t if u == GOAL else graph.nodes[u]
+
+    def h(u):
+        (ax, ay), (bx, by) = pos(u), t
+        dx, dy = abs(ax - bx), abs(ay - by)
+        if diagonal:
+            return max(dx, dy) + (SQRT2 - 1) * min(dx, dy)
+        return dx + dy
+
+    def neighbours(u):
+        if u == START:
+            yield from links_s.items()
+            if direct is not None:
+                yield GOAL, direct
+            return
+        yield from graph.edges[u].items()
+        if u in links_t:
+            yield GOAL, links_t[u]
+
+    # A* over the abstract graph
+    frontier = [(h(START), START)]
+    came = {START: None}
+    g = {START: 0.0}
+    done = set()
+    while frontier:
+        _, u = heapq.heappop(frontier)
+        if u in done:
+            continue
+        done.add(u)
+        if len(done) % CHECK_EVERY == 0:
+            checkpoint(cancel, stats, len(done))
+        if u == GOAL:
+            break
+        for v, c in neighbours(u):
+            nv = g[u] + c
+            if v not in g or nv < g[v]:
+                g[v] = nv
+                came[v] = u
+                heapq.heappush(frontier, (nv + h(v), v))
+
+    if stats is not None:
+        stats["expanded"] = len(done)
+        stats["abstract_nodes"] = len(graph.nodes)
+    if GOAL not in came:
+        return [], None
+
+    hops = []
+    cur = GOAL
+    while cur is not None:
+        hops.append(cur)
+        cur = came[cur]
+    hops.reverse()
+
+    # Refine each abstract hop into grid cells
+    cells = [s]
+    for a, b in zip(hops, hops[1:]):
+        pa, pb = pos(a), pos(b)
+        if pa == pb:
+            continue  # Start or goal sits on an entrance
+        if abs(pa[0] - pb[0]) + abs(pa[1] - pb[1]) <= 1:
+            seg = [pa, pb]
+        elif b == GOAL:
+            # dist_t is rooted at t, so descending from pa walks towards t
+            sub, _, _ = graph.sub(graph.cluster_of(t))
+            seg = _descend(dist_t, sub, (pa[0] - tx0, pa[1] - ty0), diagonal)
+            seg = [(x + tx0, y + ty0) for x, y in seg]
+        else:
+            sub, x0, y0 = graph.sub(graph.cluster_of(pb if a == START else pa))
+            dist = dist_s if a == START else _relax(sub, [(pa[0] - x0, pa[1] - y0)], diagonal)[0]
+            seg = _descend(dist, sub, (pb[0] - x0, pb[1] - y0), diagonal)
+            seg = [(x + x0, y + y0) for x, y in reversed(seg)]
+        cells.extend(seg[1:])
+    return cells, g[GOAL]
@@ -0,0 +1,90 @@
+"""
+Fast map image loading for startup.
+
+Decoding a large JPEG takes most of a cold start. Two things avoid it:
+
+- open_preview decodes a reduced copy with PIL's JPEG draft mode (the
+  decoder skips the fine DCT detail), good enough for a first frame.
+- load_decoded stores the full decoded RGB pixels once in data/cache,
+  keyed by the image's hash, and memory-maps them on later starts, so
+  pixels are paged in on demand instead of being decoded.
+
+Images from load_decoded / cached_decoded carry the source path in
+.filename, so walkways.image_hash (and every cache keyed by it) sees the
+same hash as for Image.open(path).
+"""
+
+import os
+
+import numpy as np
+from PIL import Image
+
+from walkways import CACHE_DIR, image_hash
+
+PREVIEW_SIDE = 800  # Longest side the draft preview must keep
+
+
+def decoded_path(img_hash: str, size):
+    """Cache file for an image's decoded RGB pixels."""
+    return CACHE_DIR / f"decoded_{img_hash[:16]}_{size[0]}x{size[1]}.rgb"
+
+
+def _map(path, size, source):
+    w, h = size
+    mm = np.memmap(path, dtype=np.uint8, mode="r", shape=(h, w, 3))
+    img = Image.frombuffer("RGB", size, mm, "raw", "RGB", 0, 1)
+    img.filename = str(source)
+    return img
+
+
+def open_preview(source):
+    """
+    Quick reduced-size decode for a first frame.
+
+    Returns:
+        PIL.Image | None: RGB preview, or None for formats without a
+            draft mode (the caller then needs the full decode).
+    """
+    img = Image.open(source)
+    if img.format != "JPEG":
+        return None
+    w, h = img.size
+    f = min(1.0, PREVIEW_SIDE / max(w, h))
+    img.draft("RGB", (max(1, int(w * f)), max(1, int(h * f))))  # Picks the largest reduction that fits
+    return img.convert("RGB")
+
+
+def cached_decoded(source):
+    """Memory-mapped full image if its pixels are already cached, else None."""
+    with Image.open(source) as img:
+        size = img.size
+        path = decoded_path(image_hash(img), size)
+    if not path.exists() or path.stat().st_size != size[0] * size[1] * 3:
+        return None
+    try:
+        return _map(path, size, source)
+    except Exception:
+        return None
+
+
+def load_decoded(source):
+    """
+    Full-resolution RGB image, decoded once and memory-mapped afterwards.
+    Falls back to a plain in-memory decode if the cache can't be written.
+    """
+    img = cached_decoded(source)
+    if img is not None:
+        return img
+
+    src = Image.open(source)
+    rgb = src.convert("RGB")
+    path = decoded_path(image_hash(src), rgb.size)
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+        tmp.write_bytes(rgb.tobytes())
+        os.replace(tmp, path)
+        return _map(path, rgb.size, source)
+    except Exception:
+        rgb.filename = str(source)
+        return rgb
@@ -0,0 +1,145 @@
+"""
+Lifelong Planning A* (LPA*) for routes that survive map edits.
+
+An LpaStar keeps its g / rhs values between searches. When cells open or
+close (e.g. a walkway closure is added), update_mask only re-examines the
+cells around the change and compute() repairs the route from there,
+instead of searching the whole grid again. Costs match pathfinding.astar:
+4- or 8-connected, no corner cutting, diagonal steps cost sqrt 2.
+"""
+
+import heapq
+import math
+
+from pathfinding import SQRT2, STEPS_4, STEPS_8, _walkable_fn, manhattan, octile
+from walkways import CHECK_EVERY, checkpoint
+
+INF = math.inf
+EPS = 1e-9  # Sqrt-2 sums differ in the last bit depending on order
+
+
+class LpaStar:
+    """Incremental shortest path between two fixed cells on a changing grid."""
+
+    def __init__(self, mask, s, t, diagonal=False):
+        self.s, self.t = s, t
+        self.diagonal = diagonal
+        self.steps = STEPS_8 if diagonal else STEPS_4
+        self.h = octile if diagonal else manhattan
+        self.walkable = _walkable_fn(mask)
+        self.g = {}
+        self.rhs = {s: 0}
+        self.queue = []   # (k1, k2, cell), stale entries skipped on pop
+        self.keys = {}    # cell -> its current key while queued
+        self.expanded = 0
+        self._push(s)
+
+    # ------------------ Helpers ------------------
+    def _key(self, u):
+        m = min(self.g.get(u, INF), self.rhs.get(u, INF))
+        return (m + self.h(u, self.t), m)
+
+    def _push(self, u):
+        k = self._key(u)
+        self.keys[u] = k
+        heapq.heappush(self.queue, (k[0], k[1], u))
+
+    @staticmethod
+    def _not_after(a, b):
+        """Key a <= key b, allowing for float rounding."""
+        if abs(a[0] - b[0]) > EPS:
+            return a[0] < b[0]
+        return a[1] <= b[1] + EPS
+
+    def _top_key(self):
+        while self.queue:
+            k1, k2, u = self.queue[0]
+            if self.keys.get(u) == (k1, k2):
+                return (k1, k2)
+            heapq.heappop(self.queue)  # Stale entry
+        return (INF, INF)
+
+    def _cost(self, u, v):
+        """Step cost from u to its neighbour v (inf if blocked)."""
+        walkable = self.walkable
+        if not (walkable(*u) and walkable(*v)):
+            return INF
+        dx, dy = v[0] - u[0], v[1] - u[1]
+        if dx and dy:
+            if not (walkable(u[0] + dx, u[1]) and walkable(u[0], u[1] + dy)):
+                return INF
+            return SQRT2
+        return 1
+
+    def _neighbours(self, u):
+        x, y = u
+        return [(x + dx, y + dy) for dx, dy in self.steps]
+
+    def _update(self, u):
+        if u != self.s:
+            self.rhs[u] = min(self.g.get(v, INF) + self._cost(v, u) for v in self._neighbours(u))
+        self.keys.pop(u, None)
+        if self.g.get(u, INF) != self.rhs.get(u, INF):
+            self._push(u)
+
+    # ------------------ Search ------------------
+    def compute(self, stats=None, cancel=None):
+        """
+        Bring the route up to date.
+
+        Returns:
+            tuple: (cells, cost) like the pathfinding engines.
+        """
+        t = self.t
+        # Unlike textbook LPA*, ties with t's key are settled too, so that
+        # every cell on a shortest route is consistent for _path
+        while (self._not_after(self._top_key(), self._key(t))
+               or self.rhs.get(t, INF) != self.g.get(t, INF)):
+            if not self.queue:
+                break
+            _, _, u = heapq.heappop(self.queue)
+            del self.keys[u]
+            self.expanded += 1
+            if self.expanded % CHECK_EVERY == 0:
+                checkpoint(cancel, stats, self.expanded)
+            if self.g.get(u, INF) > self.rhs.get(u, INF):
+                self.g[u] = self.rhs[u]
+                for v in self._neighbours(u):
+                    self._update(v)
+            else:
+                self.g[u] = INF
+                self._update(u)
+                for v in self._neighbours(u):
+                    self._update(v)
+
+        if stats is not None:
+            stats["expanded"] = self.expanded
+        cost = self.g.get(t, INF)
+        if cost == INF:
+            return [], None
+        return self._path(), cost
+
+    def _path(self):
+        """Follow the cheapest predecessors back from t."""
+        cells = [self.t]
+        u = self.t
+        while u != self.s:
+            u = min(self._neighbours(u), key=lambda v, u=u: self.g.get(v, INF) + self._cost(v, u))
+            cells.append(u)
+        cells.reverse()
+        return cells
+
+    def update_mask(self, mask, changed):
+        """
+        Switch to an edited grid. changed is an iterable of (x, y) cells
+        whose walkability flipped; only they and their neighbours are
+        re-examined (corner-cutting rules reach one cell further).
+        """
+        self.walkable = _walkable_fn(mask)
+        touched = set()
+        for x, y in changed:
+            for dy in (-1, 0, 1):
+                for dx in (-1, 0, 1):
+                    touched.add((x + dx, y + dy))
+        for u in touched:
+            self._update(u)
@@ -3,19 +3,40 @@ Map viewer GUI for Macleans campus.
 Handles panning, zooming, routing, and class navigation.
 """
 
+import threading
+import time
 import tkinter as tk
 from tkinter import ttk, messagebox
-from PIL import Image, ImageTk
+from PIL import Image
 
 from theme import init_style, PALETTE
 from utils import (
     find_map_image, MAP_PATH, load_markers_norm,
-    raster_route_walkways, get_building_key
+    raster_route_walkways, get_building_key, unreachable_from, load_codes_norm
 )
+from route_table import warm_route_table
+from planner import plan_day
+from polyline import simplify
+from pyramid import ScalePyramid
+from image_cache import cached_decoded, load_decoded, open_preview
+from tiles import TileRenderer
+from tile_builder import TileStore
+from overlays import OverlayLayer
+from spatial import GridIndex, place_labels, LABEL_SLOTS, MAX_PINS, ROOM_MIN_SCALE
+from walkways import RouteCancelled, load_closures
 from login import SessionManager
 
-# Predefined zoom scales
+# Zoom is continuous between MIN_SCALE and MAX_SCALE; zooming near one of
+# SCALES snaps onto it. The pyramid prebuilds those up to 1; larger zooms
+# are resampled tile by tile from the base image
 SCALES = [0.75, 1.0, 1.25, 1.5, 1.75, 2.0]
+MIN_SCALE, MAX_SCALE = 0.5, 3.0
+ZOOM_STEP = 1.1   # Scale factor per wheel notch
+SNAP = 0.02       # Relative distance at which a zoom snaps onto a level
+
+# Frame scheduling
+FRAME_MS = 16     # At most one frame per display refresh (~60 Hz)
+SETTLE_MS = 150   # Input-free time before the high-quality frame
 
 
 class MapApp:
@@ -36,18 +57,34 @@ class MapApp:
         self.style, self.palette = init_style(self.root)
 
         # Map state variables
-        self.scale_index = 1
+        self.scale = 1.0
         self.offset_x = 0
         self.offset_y = 0
         self.markers_norm = load_markers_norm()
+        self.closures = load_closures()
         self._path_points_norm = []
+        self._path_draw = (None, None, [])  # (path, scale, simplified points)
         self.highlight = None
-        self.img_item = None
-
-        # Load base map image
+        self._route_job = None  # (cancel event, after id) while a search runs
+        self._pyramid_poll = None  # after id while waiting for a zoom level
+        self._frame = None         # after id of the next scheduled frame
+        self._settle = None        # after id of the high-quality frame
+        self._dirty = False        # Full redraw needed (zoom, resize)
+        self._pan_pending = (0, 0)
+        self._last_frame = 0.0
+        self._last_input = 0.0
+        self._load_poll = None     # after id while the full map image decodes
+
+        # Load base map image: cached decoded pixels if we have them, else a
+        # draft-mode preview now (JPEG only; other formats show no map
+        # until then) and the full decode in the background
         try:
             map_path = find_map_image() or MAP_PATH
-            self.base_image = Image.open(map_path)
+            self.base_image = cached_decoded(map_path)
+            cached, preview = self.base_image is not None, None
+            if not cached:
+                self.base_image = Image.open(map_path)  # Header only; pixels come from _load_full
+                preview = open_preview(map_path)
         except Exception:
             messagebox.showerror(
                 "Map not found",
@@ -55,12 +92,55 @@ class MapApp:
             )
             self.root.destroy()
             return
+        self.pyramid = ScalePyramid(self.base_image, preview=preview, anchors=SCALES, defer=not cached)
+
+        # Pin lookups in image pixels (houses and room codes)
+        self.house_index = GridIndex({n: self._to_px(*p) for n, p in self.markers_norm.items()})
+        self.room_index = GridIndex({c: self._to_px(*p) for c, p in load_codes_norm().items()})
+        self._pin_area = None  # Image rectangle the drawn pins cover
 
         # Build UI, bind events, draw map
         self._build_ui()
         self._bind_events()
         self._redraw_all()
 
+        if cached:
+            # Precompute house-to-house routes so Route clicks are lookups
+            warm_route_table(self.markers_norm, self.base_image)
+        else:
+            self._load_full(map_path)
+
+    def _load_full(self, map_path):
+        """Decode (and cache) the full map on a worker thread, then swap it in."""
+        result = {}
+
+        def work():
+            try:
+                result["img"] = load_decoded(map_path)
+            except Exception as e:
+                result["error"] = e
+
+        worker = threading.Thread(target=work, daemon=True)
+        worker.start()
+
+        def poll():
+            if worker.is_alive():
+                self._load_poll = self.root.after(50, poll)
+                return
+            self._load_poll = None
+            img = result.get("img")
+            if img is None:
+                img = self.base_image  # Cache failed: decode in place as before
+                img.load()
+            self.base_image = img
+            if self.pyramid.base is None:
+                self.pyramid.set_base(img)
+                self._redraw_all()
+            # Precompute house-to-house routes so Route clicks are lookups
+            warm_route_table(self.markers_norm, self.base_image)
+
+        self._load_poll = self.root.after(50, poll)
+
     # ------------------ Helper ------------------
     def _to_px(self, xn, yn):
         """Convert normalized coordinates to pixel coordinates."""
@@ -97,6 +177,9 @@ class MapApp:
         # Canvas for map
         self.canvas = tk.Canvas(self.root, bg=self.palette["bg"], highlightthickness=0)
         self.canvas.pack(fill="both", expand=True, padx=10, pady=10)
+        # Prebuilt tiles (python tile_builder.py) serve exact zoom levels from disk
+        self.tiles = TileRenderer(self.canvas, self.pyramid, store=TileStore(self.base_image))
+        self.overlays = OverlayLayer(self.canvas)
 
         # Status bar
         self.status = tk.StringVar(value="Walkways-only routing; starts/ends at your exact house pins.")
@@ -112,46 +195,167 @@ class MapApp:
         self.root.bind("<Control-MouseWheel>", self._zoom_wheel)
         self.root.bind("<Button-4>", lambda e: self._zoom_step(+1, (e.x, e.y)))
         self.root.bind("<Button-5>", lambda e: self._zoom_step(-1, (e.x, e.y)))
+        self.canvas.bind("<Configure>", lambda e: self._schedule_frame())
         self.root.protocol("WM_DELETE_WINDOW", self._on_close)
 
     # ------------------ Drawing ------------------
-    def _redraw_all(self):
-        """Redraw map image and overlays."""
-        scale = SCALES[self.scale_index]
-        w, h = int(self.base_image.width * scale), int(self.base_image.height * scale)
-        self.current_img = ImageTk.PhotoImage(self.base_image.resize((w, h)), master=self.root)
-        if self.img_item is None:
-            self.img_item = self.canvas.create_image(self.offset_x, self.offset_y, anchor="nw", image=self.current_img)
+    def _viewport(self):
+        """Canvas size in pixels (a sensible default before the window maps)."""
+        cw, ch = self.canvas.winfo_width(), self.canvas.winfo_height()
+        return (cw if cw > 1 else 1000), (ch if ch > 1 else 700)
+
+    def _schedule_frame(self, pan=(0, 0)):
+        """
+        Mark the view dirty (or queue a pan) and draw it in the next frame.
+        Bursts of wheel/drag events collapse into one render per FRAME_MS.
+        """
+        now = time.perf_counter()
+        self._last_input = now
+        if pan == (0, 0):
+            self._dirty = True
+        else:
+            px, py = self._pan_pending
+            self._pan_pending = (px + pan[0], py + pan[1])
+        if self._frame is None:
+            wait = FRAME_MS - (now - self._last_frame) * 1000
+            if wait > 0:
+                self._frame = self.root.after(int(wait), self._run_frame)
+            else:
+                self._frame = self.root.after_idle(self._run_frame)
+
+    def _run_frame(self):
+        """Draw one interactive frame, then wait for input to settle."""
+        self._frame = None
+        self._last_frame = time.perf_counter()
+        dx, dy = self._pan_pending
+        self._pan_pending = (0, 0)
+        if self._dirty:
+            self._dirty = False
+            self.offset_x += dx
+            self.offset_y += dy
+            self._redraw_all(fast=True)
         else:
-            self.canvas.itemconfigure(self.img_item, image=self.current_img)
-            self.canvas.coords(self.img_item, self.offset_x, self.offset_y)
+            self._pan_by(dx, dy, fast=True)
+        if self._settle is None:
+            self._settle = self.root.after(SETTLE_MS, self._settle_frame)
+
+    def _settle_frame(self):
+        """Redraw with the high-quality filter once input has stopped."""
+        idle = (time.perf_counter() - self._last_input) * 1000
+        if idle < SETTLE_MS or self._frame is not None:
+            self._settle = self.root.after(max(1, int(SETTLE_MS - idle)), self._settle_frame)
+            return
+        self._settle = None
+        self._redraw_all()
+
+    def _redraw_all(self, fast=False):
+        """Redraw the visible map tiles, then overlays."""
+        scale = self.scale
+        exact = self.tiles.render(scale, self.offset_x, self.offset_y, self._viewport(), fast)
+        if not exact and not fast:
+            self._wait_for_level()
+        # The levels either side of this zoom make the best previews for the
+        # next one; above 1 the base already serves (levels are only shrunk)
+        below = [s for s in SCALES if s < scale]
+        above = [s for s in SCALES if scale < s <= 1]
+        for s in below[-1:] + above[:1]:
+            if self.tiles.disk_zoom(s) is None:
+                self.pyramid.request(s)
         self._redraw_overlays()
 
-    def _redraw_overlays(self):
-        """Draw markers and path overlays."""
-        # Remove old overlays
-        for item in self.canvas.find_all():
-            if item != self.img_item:
-                self.canvas.delete(item)
+    def _wait_for_level(self):
+        """Redraw once the pyramid level the current zoom renders from is built."""
+        if self._pyramid_poll is not None:
+            return
+
+        def poll():
+            self._pyramid_poll = None
+            level = self.pyramid.anchor(self.scale)
+            if self.pyramid.is_pending(level):
+                self._wait_for_level()
+            elif self.pyramid.get(level, build=False) is not None:
+                self._redraw_all()
 
-        scale = SCALES[self.scale_index]
+        self._pyramid_poll = self.root.after(30, poll)
 
-        # Draw path
-        if self._path_points_norm:
+    def _redraw_overlays(self):
+        """Bring closure, path and marker overlays up to date (only changes hit Tk)."""
+        scale = self.scale
+        layer = self.overlays
+        layer.begin((self.offset_x, self.offset_y))
+
+        # Closed areas
+        for name, pts_norm in self.closures.items():
             pts = []
-            for xn, yn in self._path_points_norm:
+            for xn, yn in pts_norm:
                 x, y = self._to_px(xn, yn)
-                pts.extend([x*scale + self.offset_x, y*scale + self.offset_y])
-            self.canvas.create_line(*pts, width=4, fill="#EF4444", capstyle="round", joinstyle="round")
-
-        # Draw markers
-        for name, (xn, yn) in self.markers_norm.items():
+                pts.extend([x*scale, y*scale])
+            if len(pts) >= 6:
+                layer.put(("closure", name), "polygon", pts, fill="#F97316", stipple="gray50",
+                          outline="#C2410C", width=2)
+
+        # Path
+        pts = []
+        for xn, yn in (self._simplified_path(scale) if self._path_points_norm else []):
             x, y = self._to_px(xn, yn)
-            cx, cy = x*scale + self.offset_x, y*scale + self.offset_y
-            r = 7
-            self.canvas.create_oval(cx-r*2, cy-r*2, cx+r*2, cy+r*2, outline="#1D4ED8", width=2)
-            self.canvas.create_oval(cx-r, cy-r, cx+r, cy+r, fill="#FBBF24", outline="#0B1220", width=1)
-            self.canvas.create_text(cx+10, cy-12, text=name, anchor="w", fill="#E5E7EB", font=("Segoe UI", 10))
+            pts.extend([x*scale, y*scale])
+        if len(pts) >= 4:
+            layer.put(("route",), "line", pts, width=4, fill="#EF4444", capstyle="round", joinstyle="round")
+
+        # Pins near the viewport: houses always, rooms once zoomed in
+        cw, ch = self._viewport()
+        x0, y0 = -self.offset_x / scale, -self.offset_y / scale
+        mx, my = cw / scale / 2, ch / scale / 2  # Half a screen of slack for panning
+        self._pin_area = (x0 - mx, y0 - my, x0 + cw / scale + mx, y0 + ch / scale + my)
+        # Houses first, then nearest the centre, so the MAX_PINS kept don't flicker
+        centre = (x0 + cw / scale / 2, y0 + ch / scale / 2)
+        pins = [("marker", n) for n in self.house_index.query(*self._pin_area, centre=centre)]
+        if scale >= ROOM_MIN_SCALE:
+            pins += [("room", c) for c in self.room_index.query(*self._pin_area, centre=centre)]
+        pins = pins[:MAX_PINS]
+
+        screen = []
+        for kind, name in pins:
+            x, y = (self.house_index if kind == "marker" else self.room_index).points[name]
+            screen.append((name, x*scale + self.offset_x, y*scale + self.offset_y))
+        labels = place_labels(screen)
+
+        for (kind, name), (_, sx, sy) in zip(pins, screen):
+            cx, cy = sx - self.offset_x, sy - self.offset_y
+            if kind == "marker":
+                r = 7
+                layer.put(("marker", name, "ring"), "oval", (cx-r*2, cy-r*2, cx+r*2, cy+r*2),
+                          outline="#1D4ED8", width=2)
+                layer.put(("marker", name, "dot"), "oval", (cx-r, cy-r, cx+r, cy+r),
+                          fill="#FBBF24", outline="#0B1220", width=1)
+            else:
+                r = 4
+                layer.put(("room", name, "dot"), "oval", (cx-r, cy-r, cx+r, cy+r),
+                          fill="#38BDF8", outline="#0B1220", width=1)
+            slot = labels.get(name)
+            if slot is not None:
+                dx, dy, anchor = LABEL_SLOTS[slot]
+                layer.put((kind, name, "label"), "text", (cx+dx, cy+dy), text=name, anchor=anchor,
+                          fill="#E5E7EB", font=("Segoe UI", 10 if kind == "marker" else 9))
+
+        layer.end()
+
+    def _pins_cover_view(self):
+        """True while the pins drawn last still cover everything on screen."""
+        if self._pin_area is None:
+            return False
+        cw, ch = self._viewport()
+        x0, y0 = -self.offset_x / self.scale, -self.offset_y / self.scale
+        ax0, ay0, ax1, ay1 = self._pin_area
+        return ax0 <= x0 and ay0 <= y0 and x0 + cw / self.scale <= ax1 and y0 + ch / self.scale <= ay1
+
+    def _simplified_path(self, scale):
+        """Route points needed at this zoom (within a pixel of the full route)."""
+        path, cached_scale, pts = self._path_draw
+        if path is not self._path_points_norm or cached_scale != scale:
+            pts = simplify(self._path_points_norm, self.base_image.size, scale)
+            self._path_draw = (self._path_points_norm, scale, pts)
+        return pts
 
     # ------------------ Pan/Zoom ------------------
     def _on_pan_press(self, ev):
@@ -163,41 +367,65 @@ class MapApp:
         dx, dy = ev.x - sx, ev.y - sy
         if not getattr(self, "_panning", False) and abs(dx) + abs(dy) >= 6:
             self._panning = True
+        self._pan_start = (ev.x, ev.y)
+        self._schedule_frame(pan=(dx, dy))
+
+    def _pan_by(self, dx, dy, fast=False):
+        """Shift the view without redrawing: every item moves, new tiles fill in."""
+        if not (dx or dy):
+            return
         self.offset_x += dx
         self.offset_y += dy
-        self._pan_start = (ev.x, ev.y)
-        self._redraw_all()
+        self.overlays.move(dx, dy)
+        if not self._pins_cover_view():
+            self._redraw_overlays()
+        exact = self.tiles.pan(dx, dy, self.scale, self.offset_x, self.offset_y,
+                               self._viewport(), fast)
+        if exact is False and not fast:
+            self._wait_for_level()
 
     def _on_pan_release(self, ev):
         self._panning = False
 
     def _zoom_wheel(self, ev):
-        step = +1 if getattr(ev, "delta", 0) > 0 else -1
-        self._zoom_step(step, (ev.x, ev.y))
+        # Windows reports multiples of 120 per notch; macOS small counts
+        delta = getattr(ev, "delta", 0)
+        step = delta / 120 if abs(delta) >= 120 else (delta > 0) - (delta < 0)
+        if step:
+            self._zoom_step(step, (ev.x, ev.y))
 
     def _zoom_step(self, step, anchor):
-        """Zoom map in/out with optional anchor point."""
-        new_index = max(0, min(self.scale_index + step, len(SCALES)-1))
-        if new_index == self.scale_index:
+        """Zoom in/out by step wheel notches (may be fractional) about an anchor point."""
+        old = self.scale
+        new = max(MIN_SCALE, min(old * ZOOM_STEP ** step, MAX_SCALE))
+        for level in SCALES:
+            if abs(new / level - 1) < SNAP:
+                new = level
+                break
+        if new == old:
             return
 
-        old, new = SCALES[self.scale_index], SCALES[new_index]
-
         if anchor is None:
-            cw, ch = self.canvas.winfo_width() or 1000, self.canvas.winfo_height() or 700
+            cw, ch = self._viewport()
             anchor = (cw // 2, ch // 2)
 
+        # Fold in any pan still waiting for its frame, so the anchor maths sees it
+        px, py = self._pan_pending
+        self._pan_pending = (0, 0)
+        self.offset_x += px
+        self.offset_y += py
+
         ax, ay = anchor
         img_x = (ax - self.offset_x) / old
         img_y = (ay - self.offset_y) / old
-        self.scale_index = new_index
-        self.offset_x = int(ax - img_x * new)
-        self.offset_y = int(ay - img_y * new)
-        self._redraw_all()
+        self.scale = new
+        self.offset_x = round(ax - img_x * new)
+        self.offset_y = round(ay - img_y * new)
+        self._schedule_frame()
 
     def _reset_view(self):
         """Reset view to default scale and position."""
-        self.scale_index = 1
+        self.scale = 1.0
         self.offset_x = 0
         self.offset_y = 0
         self._path_points_norm = []
@@ -212,23 +440,105 @@ class MapApp:
             messagebox.showerror("Error", "Choose valid From and To.")
             return
 
-        pts = raster_route_walkways(a, b, self.markers_norm, self.base_image)
+        def work(stats, cancel):
+            # Cheap connectivity check before searching (may build the mask
+            # and labels on a cold start, so it runs on the worker too)
+            cut_off = unreachable_from(a, self.markers_norm, self.base_image)
+            if b in cut_off:
+                return [], b, (f"No walkway connects {a} and {b}.\n"
+                               f"Unreachable from {a}: {', '.join(cut_off)}.")
+            return raster_route_walkways(
+                a, b, self.markers_norm, self.base_image, stats=stats, cancel=cancel
+            ), b
+
+        self._start_route(work, f"{a} → {b}")
+
+    def _plan_day(self, start, stops, optimise=False):
+        """Route a whole day of classes as one polyline."""
+        def work(stats, cancel):
+            order, pts, _ = plan_day(start, stops, self.markers_norm, self.base_image, optimise,
+                                     stats=stats, cancel=cancel)
+            return pts, order[-1]
+
+        label = f"{start} + {len(stops)} classes" + (" (optimised)" if optimise else "")
+        self._start_route(work, label)
+
+    def _start_route(self, search_fn, label):
+        """
+        Run search_fn(stats, cancel) -> (points, destination[, reason]) on a
+        worker thread so the window stays responsive. reason, if given, is
+        shown when no points come back.
+        """
+        self._cancel_route()
+        self.closures = load_closures()  # Pick up closures edited while running
+        cancel = threading.Event()
+        stats = {"expanded": 0}
+        result = {}
+
+        def work():
+            try:
+                out = search_fn(stats, cancel)
+                result["pts"], result["dest"] = out[:2]
+                result["why"] = out[2] if len(out) > 2 else None
+            except RouteCancelled:
+                result["cancelled"] = True
+            except Exception as e:
+                result["error"] = e
+
+        worker = threading.Thread(target=work, daemon=True)
+        worker.start()
+        self._route_job = (cancel, None)
+        self._poll_route(worker, cancel, stats, result, label, time.perf_counter())
+
+    def _poll_route(self, worker, cancel, stats, result, label, t0):
+        """Report search progress and pick up the result once the thread ends."""
+        if cancel.is_set():
+            return
+        if worker.is_alive():
+            self.status.set(
+                f"Routing {label}… {time.perf_counter() - t0:.1f}s, "
+                f"{stats.get('expanded', 0):,} cells searched"
+            )
+            after_id = self.root.after(100, self._poll_route, worker, cancel, stats, result, label, t0)
+            self._route_job = (cancel, after_id)
+            return
+
+        self._route_job = None
+        if "error" in result:
+            self.status.set("Routing failed.")
+            messagebox.showerror("Error", f"Routing failed: {result['error']}")
+            return
+        pts = result.get("pts")
         if not pts:
-            messagebox.showwarning("No path", "No walkway route found between those buildings.")
+            self.status.set("No walkway route found.")
+            messagebox.showwarning("No path", result.get("why") or "No walkway route found between those buildings.")
             return
 
+        self.status.set(f"Route {label} found in {time.perf_counter() - t0:.2f}s.")
         self._path_points_norm = pts
-        self._center_on_name(b)
+        self._center_on_name(result["dest"])
+
+    def _cancel_route(self):
+        """Stop any running route search and its progress polling."""
+        if self._route_job is None:
+            return
+        cancel, after_id = self._route_job
+        cancel.set()
+        if after_id is not None:
+            try:
+                self.root.after_cancel(after_id)
+            except tk.TclError:
+                pass
+        self._route_job = None
 
     def _center_on_name(self, name: str):
         """Center the map on a marker."""
         x, y = self._to_px(*self.markers_norm.get(name, (None, None)))
         if x is None:
             return
-        if self.scale_index < 2:
-            self.scale_index = 2
-        sc = SCALES[self.scale_index]
-        cw, ch = self.canvas.winfo_width() or 1000, self.canvas.winfo_height() or 700
+        self.scale = max(self.scale, SCALES[2])
+        sc = self.scale
+        cw, ch = self._viewport()
         self.offset_x = int(cw // 2 - x * sc)
         self.offset_y = int(ch // 2 - y * sc)
         self._redraw_all()
@@ -243,14 +553,19 @@ class MapApp:
             self.to_var.set(b_house)
             self._do_route()
 
-        ClassesWindow(self.root, self.user, self.markers_norm, route_from_to)
+        ClassesWindow(self.root, self.user, self.markers_norm, route_from_to, self._plan_day)
 
     def _logout(self):
         """Clear session and close app."""
         SessionManager.clear()
+        self._cancel_route()
         messagebox.showinfo("Logged out", "Session cleared. Relaunch the app to sign in again.")
         self.root.destroy()
 
     def _on_close(self):
         """Handle window close event."""
+        self._cancel_route()
+        for job in (self._pyramid_poll, self._frame, self._settle, self._load_poll):
+            if job is not None:
+                self.root.after_cancel(job)
         self.root.destroy()
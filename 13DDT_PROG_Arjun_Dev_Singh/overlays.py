@@ -0,0 +1,108 @@
+"""
+Retained overlay items for the map canvas.
+
+OverlayLayer keeps one canvas item per key (e.g. ("marker", name, "dot"))
+across redraws. A redraw is a pass: begin(), put() every item that should
+be shown, end(). put() only talks to Tk when an item is new or its
+coordinates, text or style changed; items not put in a pass are hidden
+rather than deleted, so they come back for free (up to max_hidden of
+them; past that the hidden ones are deleted). Panning moves the whole
+layer with one canvas.move. Stacking follows the order of key groups
+(key[0]) in a pass, so a route created late still sits under the markers.
+
+Coordinates given to put() are in map pixels at the current zoom (image
+position * scale). The layer adds the pan offset itself, so a pan does
+not count as a change.
+"""
+
+CREATE = {
+    "oval": "create_oval",
+    "text": "create_text",
+    "line": "create_line",
+    "polygon": "create_polygon",
+}
+
+
+class OverlayLayer:
+    """Canvas items keyed by name, updated in place."""
+
+    def __init__(self, canvas, tag: str = "overlay", max_hidden: int = 1000):
+        self.canvas = canvas
+        self.tag = tag
+        self.max_hidden = max_hidden
+        self.items = {}     # key -> [item id, coords, options]
+        self.shown = set()  # keys currently visible
+        self.offset = (0, 0)
+        self._seen = set()
+        self._groups = []   # key[0] values in the order this pass used them
+        self._created = False
+        self.tk_calls = 0   # Canvas calls made by the last pass (for profiling)
+
+    def move(self, dx, dy):
+        """Shift every item by (dx, dy) screen pixels."""
+        self.canvas.move(self.tag, dx, dy)
+        self.offset = (self.offset[0] + dx, self.offset[1] + dy)
+
+    def begin(self, offset):
+        """Start a redraw pass with the pan offset items should sit at."""
+        if offset != self.offset:
+            self.move(offset[0] - self.offset[0], offset[1] - self.offset[1])
+        self._seen = set()
+        self._groups = []
+        self._created = False
+        self.tk_calls = 0
+
+    def _screen(self, coords):
+        ox, oy = self.offset
+        return [v + (ox if i % 2 == 0 else oy) for i, v in enumerate(coords)]
+
+    def put(self, key, kind: str, coords, **options):
+        """Show an item, creating or updating it only if something changed."""
+        coords = tuple(coords)
+        self._seen.add(key)
+        if key[0] not in self._groups:
+            self._groups.append(key[0])
+        entry = self.items.get(key)
+        if entry is None:
+            create = getattr(self.canvas, CREATE[kind])
+            item = create(*self._screen(coords), tags=(self.tag, f"{self.tag}:{key[0]}"), **options)
+            self.items[key] = [item, coords, options]
+            self.shown.add(key)
+            self._created = True
+            self.tk_calls += 1
+            return
+
+        item, old_coords, old_options = entry
+        if coords != old_coords:
+            self.canvas.coords(item, *self._screen(coords))
+            entry[1] = coords
+            self.tk_calls += 1
+        if options != old_options:
+            changed = {k: v for k, v in options.items() if old_options.get(k) != v}
+            self.canvas.itemconfigure(item, **changed)
+            entry[2] = options
+            self.tk_calls += 1
+        if key not in self.shown:
+            self.canvas.itemconfigure(item, state="normal")
+            self.shown.add(key)
+            self.tk_calls += 1
+
+    def end(self):
+        """Hide items that were not put during this pass."""
+        for key in self.shown - self._seen:
+            self.canvas.itemconfigure(self.items[key][0], state="hidden")
+            self.tk_calls += 1
+        self.shown &= self._seen
+        if len(self.items) - len(self.shown) > self.max_hidden:
+            for key in [k for k in self.items if k not in self.shown]:
+                self.canvas.delete(self.items.pop(key)[0])
+                self.tk_calls += 1
+        if self._created:
+            for group in self._groups:
+                self.canvas.tag_raise(f"{self.tag}:{group}")
+
+    def clear(self):
+        """Delete every item."""
+        self.canvas.delete(self.tag)
+        self.items.clear()
+        self.shown.clear()
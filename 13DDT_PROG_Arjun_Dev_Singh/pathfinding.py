@@ -0,0 +1,433 @@
+"""
+Grid search engines for walkway routing.
+
+Every engine has the same shape:
+
+    engine(mask, s, t, diagonal=False, stats=None, cancel=None) -> (cells, cost)
+
+mask is the bool walkable grid (mask[y, x]), s and t are (x, y) cells,
+cells runs from s to t (or is [] if there is no path) and cost is the
+walk length in grid cells (None if there is no path). With diagonal=True
+the grid is 8-connected (no corner cutting, diagonal steps cost sqrt 2).
+If a stats dict is passed, engines record "expanded" (nodes popped),
+updated while they run. If a threading.Event is passed as cancel, setting
+it makes the engine raise walkways.RouteCancelled at its next checkpoint.
+
+Engines in WEIGHTED also take weight=epsilon (>= 1). They then rank nodes
+by g + epsilon * h (weighted A*), which expands far fewer cells on long
+routes and returns a path at most epsilon times the optimal length.
+"""
+
+from array import array
+import heapq
+import math
+
+import numpy as np
+
+from walkways import CHECK_EVERY, checkpoint, mask_cells
+from hpa import hpa_search
+from skeleton import skeleton_search
+
+SQRT2 = math.sqrt(2)
+
+STEPS_4 = ((1, 0), (-1, 0), (0, 1), (0, -1))
+STEPS_8 = STEPS_4 + ((1, 1), (1, -1), (-1, 1), (-1, -1))
+
+
+# ------------------ Helpers ------------------
+def _walkable_fn(mask):
+    """Fast bounds-checked walkable(x, y) over a mask."""
+    H, W = mask.shape
+    cells = mask_cells(mask)  # Byte view: faster than numpy scalars, no copy
+
+    def walkable(x, y):
+        return 0 <= x < W and 0 <= y < H and cells[y * W + x] == 1
+
+    return walkable
+
+
+def manhattan(a, b):
+    return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+
+def octile(a, b):
+    dx, dy = abs(a[0] - b[0]), abs(a[1] - b[1])
+    return max(dx, dy) + (SQRT2 - 1) * min(dx, dy)
+
+
+def _sign(v):
+    return (v > 0) - (v < 0)
+
+
+def _reconstruct(came, t):
+    cells = []
+    cur = t
+    while cur is not None:
+        cells.append(cur)
+        cur = came.get(cur)
+    cells.reverse()
+    return cells
+
+
+# ------------------ A* ------------------
+def astar(mask, s, t, diagonal=False, stats=None, cancel=None, weight=1.0):
+    """Plain A* over every neighbour cell (Manhattan or octile heuristic)."""
+    walkable = _walkable_fn(mask)
+    h = octile if diagonal else manhattan
+    steps = STEPS_8 if diagonal else STEPS_4
+
+    frontier = [(0, s)]
+    came = {s: None}
+    g = {s: 0}
+    done = set()
+
+    while frontier:
+        _, u = heapq.heappop(frontier)
+        if u in done:
+            continue  # Stale heap entry
+        done.add(u)
+        if len(done) % CHECK_EVERY == 0:
+            checkpoint(cancel, stats, len(done))
+        if u == t:
+            break
+        x, y = u
+        for dx, dy in steps:
+            v = (x + dx, y + dy)
+            if v in done or not walkable(*v):
+                continue  # Closed cells are never reopened (keeps weighted A* bounded)
+            if dx and dy:
+                # No cutting corners past buildings
+                if not (walkable(x + dx, y) and walkable(x, y + dy)):
+                    continue
+                nv = g[u] + SQRT2
+            else:
+                nv = g[u] + 1
+            if v not in g or nv < g[v]:
+                g[v] = nv
+                came[v] = u
+                heapq.heappush(frontier, (nv + weight * h(v, t), v))
+
+    if stats is not None:
+        stats["expanded"] = len(done)
+    if t not in came:
+        return [], None
+    return _reconstruct(came, t), g[t]
+
+
+# ------------------ Bidirectional A* ------------------
+def bidirectional(mask, s, t, diagonal=False, stats=None, cancel=None):
+    """
+    A* from both ends at once, meeting in the middle.
+
+    Each step expands the side with the smaller frontier. Both sides rank
+    cells by the averaged potential (h_t - h_s) / 2, which keeps them
+    consistent with each other, and the search stops once the two frontier
+    keys add up to the best meeting found (optimal result).
+
+    On the campus map this does not beat astar: over all house pairs it
+    expands about 2% more cells at grid_scale=3 (59,101 vs 58,016) and
+    about 30% more at grid_scale=1 (200,624 vs 154,580). It is kept for
+    comparison in bench.py; astar is the default. There is no weighted
+    mode: weighted frontiers from both ends tend to miss each other and
+    expand more cells than weighted astar.
+    """
+    walkable = _walkable_fn(mask)
+    h = octile if diagonal else manhattan
+    steps = STEPS_8 if diagonal else STEPS_4
+    if s == t:
+        if stats is not None:
+            stats["expanded"] = 0
+        return ([s], 0) if walkable(*s) else ([], None)
+
+    def key(v, side):
+        p = (h(v, t) - h(v, s)) / 2
+        return p if side == 0 else -p
+
+    def finished():
+        return frontier[0][0][0] + frontier[1][0][0] >= best
+
+    # Side 0 searches from s, side 1 from t; heap entries are (key + g, -g, cell)
+    g = ({s: 0}, {t: 0})
+    came = ({s: None}, {t: None})
+    frontier = ([(key(s, 0), 0, s)], [(key(t, 1), 0, t)])
+    best, meet = math.inf, None
+    expanded = 0
+
+    while frontier[0] and frontier[1] and not finished():
+        side = 0 if len(frontier[0]) <= len(frontier[1]) else 1
+        _, gu, u = heapq.heappop(frontier[side])
+        gu = -gu
+        gs, other = g[side], g[1 - side]
+        if gu > gs[u]:
+            continue  # Stale heap entry
+        expanded += 1
+        if expanded % CHECK_EVERY == 0:
+            checkpoint(cancel, stats, expanded)
+
+        x, y = u
+        for dx, dy in steps:
+            v = (x + dx, y + dy)
+            if not walkable(*v):
+                continue
+            if dx and dy:
+                if not (walkable(x + dx, y) and walkable(x, y + dy)):
+                    continue
+                nv = gu + SQRT2
+            else:
+                nv = gu + 1
+            if v not in gs or nv < gs[v]:
+                gs[v] = nv
+                came[side][v] = u
+                heapq.heappush(frontier[side], (nv + key(v, side), -nv, v))
+                if v in other and nv + other[v] < best:
+                    best, meet = nv + other[v], v
+
+    if stats is not None:
+        stats["expanded"] = expanded
+    if meet is None:
+        return [], None
+    head = _reconstruct(came[0], meet)
+    tail = _reconstruct(came[1], meet)
+    tail.reverse()
+    return head + tail[1:], best
+
+
+# ------------------ Jump Point Search ------------------
+_JUMP_TABLES = {}  # id(mask) -> (mask, tables); masks are cached, so ids are stable
+
+
+def _shift(a, dy, dx):
+    """b[y, x] = a[y + dy, x + dx], False outside the grid."""
+    H, W = a.shape
+    b = np.zeros_like(a)
+    b[max(0, -dy):H - max(0, dy), max(0, -dx):W - max(0, dx)] = \
+        a[max(0, dy):H - max(0, -dy), max(0, dx):W - max(0, -dx)]
+    return b
+
+
+def _jump_tables(mask):
+    """
+    Precompute, for each cell and straight direction, the first cell at or
+    beyond it where a straight jump has to stop (a wall or a forced
+    neighbour). Straight jumps then cost one array lookup, not a scan.
+    """
+    hit = _JUMP_TABLES.get(id(mask))
+    if hit is not None and hit[0] is mask:
+        return hit[1]
+
+    H, W = mask.shape
+    w = mask
+    n, s_ = _shift(w, -1, 0), _shift(w, 1, 0)
+    e, w_ = _shift(w, 0, 1), _shift(w, 0, -1)
+    forced = {
+        (1, 0): (n & ~_shift(w, -1, -1)) | (s_ & ~_shift(w, 1, -1)),
+        (-1, 0): (n & ~_shift(w, -1, 1)) | (s_ & ~_shift(w, 1, 1)),
+        (0, 1): (w_ & ~_shift(w, -1, -1)) | (e & ~_shift(w, -1, 1)),
+        (0, -1): (w_ & ~_shift(w, 1, -1)) | (e & ~_shift(w, 1, 1)),
+    }
+
+    cols = np.broadcast_to(np.arange(W), (H, W))
+    rows = np.broadcast_to(np.arange(H)[:, None], (H, W))
+    tables = {}
+    for (dx, dy), f in forced.items():
+        stop = ~w | f
+        if dx == 1:
+            idx = np.where(stop, cols, W)
+            nxt = np.minimum.accumulate(idx[:, ::-1], axis=1)[:, ::-1]
+        elif dx == -1:
+            idx = np.where(stop, cols, -1)
+            nxt = np.maximum.accumulate(idx, axis=1)
+        elif dy == 1:
+            idx = np.where(stop, rows, H)
+            nxt = np.minimum.accumulate(idx[::-1], axis=0)[::-1]
+        else:
+            idx = np.where(stop, rows, -1)
+            nxt = np.maximum.accumulate(idx, axis=0)
+        tables[(dx, dy)] = array("i", nxt.astype(np.int32).tobytes())
+
+    _JUMP_TABLES.clear()  # Only keep tables for the latest mask
+    _JUMP_TABLES[id(mask)] = (mask, tables)
+    return tables
+
+
+def jps(mask, s, t, diagonal=False, stats=None, cancel=None, weight=1.0):
+    """
+    Jump Point Search for uniform-cost grids.
+
+    Only jump points are pushed onto the heap; straight runs between them
+    are resolved from precomputed stop tables. The 8-connected variant
+    follows the no-corner-cutting rules; the 4-connected variant treats
+    vertical runs like diagonals (they check both row jumps at every step).
+    """
+    walkable = _walkable_fn(mask)
+    h = octile if diagonal else manhattan
+    H, W = mask.shape
+    tx, ty = t
+    tables = _jump_tables(mask)
+    next_e, next_w = tables[(1, 0)], tables[(-1, 0)]
+    next_s, next_n = tables[(0, 1)], tables[(0, -1)]
+
+    def jump_straight_h(x, y, dx):
+        """Jump along a row to the goal, a forced cell, or None at a wall."""
+        x += dx
+        if not 0 <= x < W:
+            return None
+        stop = (next_e if dx > 0 else next_w)[y * W + x]
+        if y == ty and (x <= tx <= stop if dx > 0 else stop <= tx <= x):
+            return t if walkable(tx, ty) else None
+        if 0 <= stop < W and walkable(stop, y):
+            return (stop, y)
+        return None
+
+    def jump_straight_v(x, y, dy):
+        y += dy
+        if not 0 <= y < H:
+            return None
+        stop = (next_s if dy > 0 else next_n)[y * W + x]
+        if x == tx and (y <= ty <= stop if dy > 0 else stop <= ty <= y):
+            return t if walkable(tx, ty) else None
+        if 0 <= stop < H and walkable(x, stop):
+            return (x, stop)
+        return None
+
+    def jump_vertical_4(x, y, dy):
+        """4-connected vertical run: stop wherever a row scan finds something."""
+        while True:
+            y += dy
+            if not walkable(x, y):
+                return None
+            if x == tx and y == ty:
+                return (x, y)
+            if jump_straight_h(x, y, 1) or jump_straight_h(x, y, -1):
+                return (x, y)
+
+    def jump_diagonal(x, y, dx, dy):
+        while True:
+            # Diagonal step only when both orthogonal cells are open
+            if not (walkable(x + dx, y) and walkable(x, y + dy)):
+                return None
+            x += dx
+            y += dy
+            if not walkable(x, y):
+                return None
+            if x == tx and y == ty:
+                return (x, y)
+            if jump_straight_h(x, y, dx) or jump_straight_v(x, y, dy):
+                return (x, y)
+
+    def jump(x, y, dx, dy):
+        if dx and dy:
+            return jump_diagonal(x, y, dx, dy)
+        if dx:
+            return jump_straight_h(x, y, dx)
+        if diagonal:
+            return jump_straight_v(x, y, dy)
+        return jump_vertical_4(x, y, dy)
+
+    def directions(u, parent):
+        """Pruned set of directions to jump in from u."""
+        x, y = u
+        if parent is None:
+            steps = STEPS_8 if diagonal else STEPS_4
+            return [(dx, dy) for dx, dy in steps
+                    if walkable(x + dx, y + dy)
+                    and (not (dx and dy) or (walkable(x + dx, y) and walkable(x, y + dy)))]
+
+        dx, dy = _sign(x - parent[0]), _sign(y - parent[1])
+        out = []
+        if not diagonal:
+            if dx:
+                out.append((dx, 0))
+                for ny in (1, -1):
+                    if walkable(x, y + ny) and not walkable(x - dx, y + ny):
+                        out.append((0, ny))
+            else:
+                out.extend(((0, dy), (1, 0), (-1, 0)))
+            return out
+
+        if dx and dy:
+            out.extend(((dx, 0), (0, dy), (dx, dy)))
+        elif dx:
+            out.append((dx, 0))
+            for ny in (1, -1):
+                if walkable(x, y + ny):
+                    out.extend(((0, ny), (dx, ny)))
+        else:
+            out.append((0, dy))
+            for nx in (1, -1):
+                if walkable(x + nx, y):
+                    out.extend(((nx, 0), (nx, dy)))
+        return out
+
+    frontier = [(0, s)]
+    came = {s: None}
+    g = {s: 0}
+    done = set()
+
+    while frontier:
+        _, u = heapq.heappop(frontier)
+        if u in done:
+            continue
+        done.add(u)
+        if len(done) % CHECK_EVERY == 0:
+            checkpoint(cancel, stats, len(done))
+        if u == t:
+            break
+        for dx, dy in directions(u, came[u]):
+            jp = jump(u[0], u[1], dx, dy)
+            if jp is None or jp in done:
+                continue
+            nv = g[u] + h(u, jp)
+            if jp not in g or nv < g[jp]:
+                g[jp] = nv
+                came[jp] = u
+                heapq.heappush(frontier, (nv + weight * h(jp, t), jp))
+
+    if stats is not None:
+        stats["expanded"] = len(done)
+    if t not in came:
+        return [], None
+
+    # Expand the jump points back into individual cells
+    points = _reconstruct(came, t)
+    cells = [points[0]]
+    for (ax, ay), (bx, by) in zip(points, points[1:]):
+        dx, dy = _sign(bx - ax), _sign(by - ay)
+        x, y = ax, ay
+        while (x, y) != (bx, by):
+            x += dx if x != bx else 0
+            y += dy if y != by else 0
+            cells.append((x, y))
+    return cells, g[t]
+
+
+# ------------------ Engine Registry ------------------
+ENGINES = {
+    "astar": astar,
+    "bidir": bidirectional,
+    "jps": jps,
+    "hpa": hpa_search,
+    "skeleton": skeleton_search,
+}
+
+WEIGHTED = {"astar", "jps"}  # Engines that accept a weight
+
+
+def search(mask, s, t, engine: str = "astar", diagonal: bool = False, stats=None, cancel=None,
+           epsilon: float = 1.0):
+    """
+    Run the named engine. epsilon > 1 selects weighted A* (path at most
+    epsilon times optimal). Raises ValueError for an unknown engine, for
+    epsilon < 1, or for epsilon > 1 with an engine outside WEIGHTED.
+    """
+    try:
+        fn = ENGINES[engine]
+    except KeyError:
+        raise ValueError(f"Unknown routing engine: {engine}") from None
+    if epsilon < 1:
+        raise ValueError(f"epsilon must be >= 1, got {epsilon}")
+    if epsilon == 1:
+        return fn(mask, s, t, diagonal=diagonal, stats=stats, cancel=cancel)
+    if engine not in WEIGHTED:
+        raise ValueError(f"Engine {engine} has no weighted mode")
+    return fn(mask, s, t, diagonal=diagonal, stats=stats, cancel=cancel, weight=epsilon)
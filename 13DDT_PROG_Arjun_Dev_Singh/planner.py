@@ -0,0 +1,193 @@
+"""
+Multi-stop routing for a day of classes.
+
+plan_day chains a list of houses into one walkway route, leg by leg. Legs
+come from the precomputed route table when it is warm (see route_table.py)
+and are otherwise searched once and kept in memory, so the pairwise
+house distances are shared between plans.
+
+With optimise=True the stops after the start are reordered to minimise
+the total walk: exactly (Held-Karp) for up to EXACT_MAX stops, and with
+nearest neighbour plus 2-opt beyond that.
+"""
+
+from itertools import combinations
+import math
+
+from route_table import lookup_route, table_key
+from utils import CODE_PREFIX_TO_HOUSE, raster_route_with_cost
+from walkways import RouteCancelled, closures_digest, load_closures
+
+EXACT_MAX = 10  # Held-Karp is O(2^n * n^2); fine up to about this many stops
+
+_LEGS = {}  # (table key, closures digest, a, b) -> (path, dist), a < b
+
+
+# ------------------ Stops ------------------
+def class_house(row, markers_norm: dict):
+    """House for a classes row: its house column, else its room code prefix."""
+    house = (row["house"] or "").strip() or \
+        CODE_PREFIX_TO_HOUSE.get((row["code"] or "").strip().upper()[:1], "")
+    return house if house in markers_norm else None
+
+
+# ------------------ Legs ------------------
+def leg(a: str, b: str, markers_norm: dict, pil_image, grid_scale: int = 3,
+        sat_max: int = 40, val_min: int = 200, stats: dict = None, cancel=None):
+    """
+    Route between two houses, reusing the route table and earlier legs.
+    Raises walkways.RouteCancelled once cancel (a threading.Event) is set.
+
+    Returns:
+        tuple: (path, dist) from a to b, or ([], None) if unreachable.
+    """
+    if cancel is not None and cancel.is_set():
+        raise RouteCancelled()
+    if a == b:
+        return [tuple(markers_norm[a])], 0
+    first, second = sorted((a, b))
+    key = (table_key(markers_norm, pil_image, grid_scale, sat_max, val_min),
+           closures_digest(load_closures()), first, second)
+    hit = _LEGS.get(key)
+    if hit is None:
+        hit = lookup_route(first, second, markers_norm, pil_image, grid_scale, sat_max, val_min)
+        if hit is None:
+            hit = raster_route_with_cost(first, second, markers_norm, pil_image,
+                                         grid_scale, sat_max, val_min, stats=stats, cancel=cancel)
+        _LEGS[key] = hit
+    path, dist = hit
+    return (list(path) if a == first else path[::-1]), dist
+
+
+def distance_matrix(houses, markers_norm: dict, pil_image, **kwargs):
+    """Pairwise walk distances between houses (math.inf if unreachable)."""
+    n = len(houses)
+    dist = [[0.0] * n for _ in range(n)]
+    for i, j in combinations(range(n), 2):
+        d = leg(houses[i], houses[j], markers_norm, pil_image, **kwargs)[1]
+        dist[i][j] = dist[j][i] = math.inf if d is None else d
+    return dist
+
+
+# ------------------ Ordering ------------------
+def _path_cost(order, dist):
+    return sum(dist[a][b] for a, b in zip(order, order[1:]))
+
+
+def order_exact(dist):
+    """
+    Shortest open tour that starts at index 0 and visits every index once
+    (Held-Karp dynamic programming over subsets).
+    """
+    n = len(dist)
+    if n <= 2:
+        return list(range(n))
+    full = 1 << (n - 1)  # subsets of stops 1..n-1
+    best = [[math.inf] * n for _ in range(full)]
+    back = [[-1] * n for _ in range(full)]
+    for j in range(1, n):
+        best[1 << (j - 1)][j] = dist[0][j]
+        back[1 << (j - 1)][j] = 0
+
+    for subset in range(1, full):
+        row = best[subset]
+        for j in range(1, n):
+            cost = row[j]
+            if cost == math.inf:
+                continue
+            for k in range(1, n):
+                bit = 1 << (k - 1)
+                if subset & bit:
+                    continue
+                nv = cost + dist[j][k]
+                if nv < best[subset | bit][k]:
+                    best[subset | bit][k] = nv
+                    back[subset | bit][k] = j
+
+    last = min(range(1, n), key=lambda j: best[full - 1][j])
+    if best[full - 1][last] == math.inf:
+        return order_heuristic(dist)  # Some stop is unreachable; any order will do
+    order, subset = [], full - 1
+    while last > 0:
+        order.append(last)
+        last, subset = back[subset][last], subset & ~(1 << (last - 1))
+    order.append(0)
+    order.reverse()
+    return order
+
+
+def order_heuristic(dist):
+    """Nearest neighbour from index 0, then 2-opt until nothing improves."""
+    n = len(dist)
+    order, left = [0], set(range(1, n))
+    while left:
+        nxt = min(left, key=lambda j: dist[order[-1]][j])
+        order.append(nxt)
+        left.remove(nxt)
+
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, n - 1):
+            for j in range(i + 1, n):
+                # Reverse order[i..j]; the tour is open, so j may be the end
+                before = dist[order[i - 1]][order[i]]
+                after = dist[order[i - 1]][order[j]]
+                if j + 1 < n:
+                    before += dist[order[j]][order[j + 1]]
+                    after += dist[order[i]][order[j + 1]]
+                if after < before - 1e-9:
+                    order[i:j + 1] = order[i:j + 1][::-1]
+                    improved = True
+    return order
+
+
+def best_order(dist):
+    """Visiting order starting at index 0: exact for small inputs."""
+    if len(dist) <= EXACT_MAX:
+        return order_exact(dist)
+    return order_heuristic(dist)
+
+
+# ------------------ Plan ------------------
+def plan_day(start: str, stops, markers_norm: dict, pil_image, optimise: bool = False,
+             grid_scale: int = 3, sat_max: int = 40, val_min: int = 200,
+             stats: dict = None, cancel=None):
+    """
+    Chain a start house and a list of class houses into one route.
+
+    Args:
+        start (str): House the day starts from.
+        stops (list[str]): Class houses in timetable order.
+        optimise (bool): Reorder the stops to minimise the total walk.
+        stats, cancel: Passed to every leg search; cancel is checked
+            between legs too (raises walkways.RouteCancelled).
+
+    Returns:
+        tuple: (order, path, dist) where order is the list of houses as
+            visited, path is a single normalized polyline and dist is the
+            total length in image pixels. path is [] and dist None if
+            some leg has no walkway route.
+    """
+    kwargs = dict(grid_scale=grid_scale, sat_max=sat_max, val_min=val_min, stats=stats, cancel=cancel)
+    houses = [start] + list(stops)
+    for h in houses:
+        if h not in markers_norm:
+            raise ValueError(f"Unknown house: {h}")
+
+    if optimise and len(houses) > 2:
+        # Visit each distinct house once; repeats cost nothing extra
+        unique = list(dict.fromkeys(houses))
+        idx = best_order(distance_matrix(unique, markers_norm, pil_image, **kwargs))
+        houses = [unique[i] for i in idx]
+
+    path, total = [tuple(markers_norm[start])], 0
+    for a, b in zip(houses, houses[1:]):
+        if a == b:
+            continue
+        pts, d = leg(a, b, markers_norm, pil_image, **kwargs)
+        if d is None:
+            return houses, [], None
+        path.extend(pts[1:])  # First point repeats the previous leg's end
+        total += d
+    return houses, path, total
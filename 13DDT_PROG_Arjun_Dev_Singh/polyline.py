@@ -0,0 +1,131 @@
+"""
+Route polyline helpers: simplification and compact storage.
+
+Grid routes come back with one point per cell. Most of those points sit
+on straight runs, so:
+
+- collapse_collinear drops points that don't change direction (lossless),
+- simplify applies Douglas-Peucker with a tolerance in screen pixels,
+- encode/decode store a route as a delta-encoded string (the Google
+  "encoded polyline" format) instead of a list of float pairs.
+"""
+
+import math
+
+PRECISION = 5  # Decimal places kept by encode (1e-5 of the map ~ 0.01 px)
+
+
+# ------------------ Simplify ------------------
+def collapse_collinear(points):
+    """Drop interior points that lie on a straight run between neighbours."""
+    if len(points) < 3:
+        return list(points)
+    out = [points[0]]
+    for i in range(1, len(points) - 1):
+        (ax, ay), (bx, by), (cx, cy) = out[-1], points[i], points[i + 1]
+        cross = (bx - ax) * (cy - by) - (by - ay) * (cx - bx)
+        if abs(cross) > 1e-12 or (bx - ax) * (cx - bx) + (by - ay) * (cy - by) < 0:
+            out.append(points[i])  # Turn (or a U-turn) at b
+    out.append(points[-1])
+    return out
+
+
+def _seg_dist(p, a, b):
+    """Distance from p to segment ab."""
+    (px, py), (ax, ay), (bx, by) = p, a, b
+    dx, dy = bx - ax, by - ay
+    L = dx * dx + dy * dy
+    if L == 0:
+        return math.hypot(px - ax, py - ay)
+    t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / L))
+    return math.hypot(px - ax - t * dx, py - ay - t * dy)
+
+
+def _dp_keep(points, tolerance: float):
+    """Flags for the points Douglas-Peucker keeps (iterative, no recursion limit)."""
+    n = len(points)
+    keep = [True] * n
+    if n < 3 or tolerance <= 0:
+        return keep
+    keep = [False] * n
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        i, j = stack.pop()
+        far, far_d = -1, tolerance
+        for k in range(i + 1, j):
+            d = _seg_dist(points[k], points[i], points[j])
+            if d > far_d:
+                far, far_d = k, d
+        if far >= 0:
+            keep[far] = True
+            stack.append((i, far))
+            stack.append((far, j))
+    return keep
+
+
+def douglas_peucker(points, tolerance: float):
+    """Keep the end points and every point needed to stay within tolerance."""
+    return [p for p, k in zip(points, _dp_keep(points, tolerance)) if k]
+
+
+def simplify(path_norm, image_size, scale: float = 1.0, tolerance_px: float = 1.0):
+    """
+    Simplify a normalized route for drawing at a given zoom.
+
+    Args:
+        path_norm (list): Normalized (x, y) points.
+        image_size (tuple): (width, height) of the base map image.
+        scale (float): Current zoom factor (screen px per image px).
+        tolerance_px (float): Max deviation from the full route, in screen pixels.
+
+    Returns:
+        list: A subset of path_norm with the same end points.
+    """
+    pts = collapse_collinear(path_norm)
+    w, h = image_size
+    sx, sy = w * scale, h * scale
+    keep = _dp_keep([(x * sx, y * sy) for x, y in pts], tolerance_px)
+    return [p for p, k in zip(pts, keep) if k]
+
+
+# ------------------ Encode ------------------
+def _encode_value(v: int, out: list):
+    v = ~(v << 1) if v < 0 else v << 1
+    while v >= 0x20:
+        out.append(chr((0x20 | (v & 0x1F)) + 63))
+        v >>= 5
+    out.append(chr(v + 63))
+
+
+def encode(points, precision: int = PRECISION) -> str:
+    """Delta-encode (x, y) points as a compact ASCII string."""
+    f = 10 ** precision
+    out = []
+    px = py = 0
+    for x, y in points:
+        ix, iy = round(x * f), round(y * f)
+        _encode_value(ix - px, out)
+        _encode_value(iy - py, out)
+        px, py = ix, iy
+    return "".join(out)
+
+
+def decode(text: str, precision: int = PRECISION):
+    """Inverse of encode; returns a list of (x, y) tuples."""
+    f = 10 ** precision
+    values, v, shift = [], 0, 0
+    for ch in text:
+        b = ord(ch) - 63
+        v |= (b & 0x1F) << shift
+        shift += 5
+        if b < 0x20:
+            values.append(~(v >> 1) if v & 1 else v >> 1)
+            v, shift = 0, 0
+
+    points, x, y = [], 0, 0
+    for dx, dy in zip(values[::2], values[1::2]):
+        x += dx
+        y += dy
+        points.append((x / f, y / f))
+    return points
@@ -0,0 +1,150 @@
+"""
+Pre-resized copies of the map image, one per zoom scale.
+
+ScalePyramid.get(scale) returns the whole map already resized to that
+scale, so a redraw only has to crop it. Levels are built on first use by
+a background thread and kept in an LRU under a memory budget; until a
+level is ready, get returns None. Only anchor scales are ever built: the
+caller's own zoom levels up to 1 plus powers of two below 1. A zoom
+between anchors resamples its tiles from anchor(scale), so continuous
+zooming never queues a full-image resize per scale. Enlarged levels hold
+no more detail than the base, so zooms above 1 always render from the
+base and no level above 1 is ever built.
+Levels larger than the whole budget are never built. nearest() hands out
+the closest level already in memory, for quick previews at any scale.
+
+At startup the full-resolution base may not be decoded yet: a pyramid
+made with preview= serves that reduced image through nearest() and
+reports every level as pending until set_base() hands over the real one.
+With defer=True and no preview (formats without a draft decode) there is
+nothing to show until then, and nearest() returns None.
+"""
+
+from collections import OrderedDict
+import queue
+import threading
+
+from PIL import Image
+
+BUDGET_BYTES = 256 * 1024 * 1024  # Pixel memory allowed for cached levels
+POWERS = [2.0 ** -k for k in range(1, 7)]  # Anchor scales besides the caller's own
+
+
+def image_bytes(img) -> int:
+    """Approximate pixel memory of a PIL image."""
+    return img.width * img.height * len(img.getbands())
+
+
+class ScalePyramid:
+    """Lazily built, LRU-bounded set of resized map images keyed by scale."""
+
+    def __init__(self, base_image, budget_bytes: int = BUDGET_BYTES, preview=None, anchors=(),
+                 defer: bool = False):
+        self.size = base_image.size
+        self.anchors = sorted({a for a in anchors if a <= 1} | set(POWERS) | {1.0})
+        self.bands = len(base_image.getbands())
+        self.preview = preview
+        self.base = None
+        self.ready = threading.Event()
+        self.budget = budget_bytes
+        self.levels = OrderedDict()  # scale -> PIL image, most recently used last
+        self.used = 0
+        self.pending = set()
+        self.lock = threading.Lock()
+        self.jobs = queue.Queue()
+        threading.Thread(target=self._worker, daemon=True).start()
+        if preview is None and not defer:
+            self.set_base(base_image)
+
+    def set_base(self, base_image):
+        """Install the full-resolution image; queued levels start building."""
+        base_image.load()  # Decode now so worker threads only ever read pixels
+        self.base = base_image
+        self.bands = len(base_image.getbands())
+        self.ready.set()
+
+    def size_at(self, scale: float):
+        """Pixel size of the map at a scale."""
+        return max(1, int(self.size[0] * scale)), max(1, int(self.size[1] * scale))
+
+    def fits(self, scale: float) -> bool:
+        """True if a level at this scale fits in the memory budget."""
+        w, h = self.size_at(scale)
+        return scale == 1 or w * h * self.bands <= self.budget
+
+    def anchor(self, scale: float) -> float:
+        """
+        Level to render a zoom from: the zoom itself if it is an anchor,
+        else the smallest anchor above it, within budget, to shrink from.
+        Zooms above 1 use the base.
+        """
+        if scale >= 1:
+            return 1.0
+        if scale in self.anchors and self.fits(scale):
+            return scale
+        return min(a for a in self.anchors if a >= scale and self.fits(a))
+
+    def get(self, scale: float, build: bool = True):
+        """The map resized to scale, or None if it is still being built (or build is False)."""
+        if scale == 1 or self.base is None:
+            return self.base
+        with self.lock:
+            img = self.levels.get(scale)
+            if img is not None:
+                self.levels.move_to_end(scale)
+                return img
+        if build:
+            self.request(scale)
+        return None
+
+    def nearest(self, scale: float):
+        """
+        The cached level best suited to scaling to scale: the smallest one
+        at or above it, else the largest below (the base always counts).
+
+        Returns:
+            tuple | None: (level scale, PIL image), or None while a
+                deferred base without a preview is still loading.
+        """
+        with self.lock:
+            levels = dict(self.levels)
+        if self.base is not None:
+            levels[1] = self.base
+        elif not levels:
+            if self.preview is None:
+                return None
+            return self.preview.width / self.size[0], self.preview
+        above = [s for s in levels if s >= scale]
+        best = min(above) if above else max(levels)
+        return best, levels[best]
+
+    def request(self, scale: float):
+        """Queue a level for building (no-op if cached, queued, too big or not an anchor)."""
+        if scale == 1 or scale not in self.anchors or not self.fits(scale):
+            return
+        with self.lock:
+            if scale in self.levels or scale in self.pending:
+                return
+            self.pending.add(scale)
+        self.jobs.put(scale)
+
+    def is_pending(self, scale: float = None) -> bool:
+        """True while a level (or any level, if scale is None) is being built."""
+        if self.base is None:
+            return True  # Everything waits for the full-resolution image
+        with self.lock:
+            return scale in self.pending if scale is not None else bool(self.pending)
+
+    def _worker(self):
+        self.ready.wait()
+        while True:
+            scale = self.jobs.get()
+            img = self.base.resize(self.size_at(scale), Image.LANCZOS)
+            with self.lock:
+                self.pending.discard(scale)
+                self.levels[scale] = img
+                self.used += image_bytes(img)
+                # Evict least recently used levels, but always keep the newest
+                while self.used > self.budget and len(self.levels) > 1:
+                    _, old = self.levels.popitem(last=False)
+                    self.used -= image_bytes(old)
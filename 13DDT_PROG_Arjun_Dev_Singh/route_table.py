@@ -0,0 +1,291 @@
+"""
+Precomputed house-to-house route table.
+
+Every pair of house pins is routed once per (map image, markers, routing
+parameters) and saved under data/cache. Route clicks for a known pair are
+then a dictionary lookup instead of an A* search. The table key includes
+the image hash and the marker positions, so editing the map or
+markers.json invalidates it automatically. When closures.json changes,
+the table is repaired rather than rebuilt: only routes that cross a new
+closure are searched again, with LPA* (lpa.py) so later edits in the same
+session reuse earlier work. Paths are stored with straight
+runs collapsed and delta-encoded (see polyline.py), which keeps the file
+small enough to load instantly.
+
+Run this file directly to build the table ahead of time.
+"""
+
+from itertools import combinations
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+from lpa import LpaStar
+from pathfinding import search
+from polyline import collapse_collinear, decode, encode
+from walkways import (
+    CACHE_DIR, closed_cells, closures_digest, image_hash, load_closures, load_walk_mask,
+    routing_mask, same_component, snap_norm,
+)
+
+TABLE_FORMAT = 2  # 2: paths stored as delta-encoded strings (polyline.encode)
+
+# Loaded tables: key -> {"A|B": {"dist": float | None, "line": encoded path}}
+_TABLES = {}
+_CLOSURES = {}  # key -> closures the loaded table was routed with
+_PLANNERS = {}  # (key, "A|B") -> (LpaStar, mask it last searched), for repairs
+_LOCK = threading.Lock()  # One build/repair at a time
+
+
+# ------------------ Keys / Paths ------------------
+def table_key(markers_norm: dict, pil_image, grid_scale: int = 3,
+              sat_max: int = 40, val_min: int = 200) -> str:
+    """Hash of everything a cached route depends on."""
+    pins = json.dumps({k: list(v) for k, v in sorted(markers_norm.items())})
+    raw = f"{image_hash(pil_image)}|{pins}|{grid_scale}|{sat_max}|{val_min}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def table_path(key: str):
+    """Path of the cached table file for a key."""
+    return CACHE_DIR / f"routes_{key[:16]}.json"
+
+
+def _pair_id(a: str, b: str) -> str:
+    return f"{a}|{b}"
+
+
+# ------------------ Load / Lookup ------------------
+def get_table(key: str):
+    """Return the route table for a key (memory, then disk), or None."""
+    table = _TABLES.get(key)
+    if table is not None:
+        return table
+    try:
+        data = json.loads(table_path(key).read_text(encoding="utf-8"))
+    except Exception:
+        return None
+    if data.get("key") != key or data.get("format") != TABLE_FORMAT:
+        return None
+    _CLOSURES[key] = {k: [tuple(p) for p in v] for k, v in data.get("closures", {}).items()}
+    _TABLES[key] = data["routes"]
+    return data["routes"]
+
+
+def is_stale(key: str) -> bool:
+    """True if the loaded table was routed with different closures than closures.json."""
+    return closures_digest(_CLOSURES.get(key, {})) != closures_digest(load_closures())
+
+
+def lookup_route(start: str, end: str, markers_norm: dict, pil_image,
+                 grid_scale: int = 3, sat_max: int = 40, val_min: int = 200):
+    """
+    Look up a house-to-house route in the table.
+
+    Returns:
+        tuple | None: (path, dist) if the pair is cached, else None.
+            An unreachable pair is cached as ([], None).
+    """
+    if start == end:
+        return None
+    key = table_key(markers_norm, pil_image, grid_scale, sat_max, val_min)
+    table = get_table(key)
+    if table and is_stale(key):
+        # Repair now unless another thread already is; then search instead
+        if not _LOCK.acquire(blocking=False):
+            return None
+        try:
+            table = _repair(key, markers_norm, pil_image, grid_scale, sat_max, val_min)
+        finally:
+            _LOCK.release()
+    if not table:
+        return None
+
+    entry = table.get(_pair_id(start, end))
+    reverse = False
+    if entry is None:
+        entry = table.get(_pair_id(end, start))
+        reverse = True
+    if entry is None:
+        return None
+
+    path = decode(entry["line"])
+    if reverse:
+        path.reverse()
+    if path:
+        # Encoding rounds coordinates; put the exact pins back
+        path[0], path[-1] = tuple(markers_norm[start]), tuple(markers_norm[end])
+    return path, entry["dist"]
+
+
+# ------------------ Build ------------------
+def _entry(path, dist):
+    # Straight runs add nothing to the shape, so only turns are stored
+    return {"dist": dist, "line": encode(collapse_collinear(path))}
+
+
+def _snap_pair(mask, a: str, b: str, markers_norm: dict, size, grid_scale: int):
+    """Grid cells for a house pair, and whether any route can join them."""
+    s = snap_norm(mask, markers_norm[a], size, grid_scale)
+    t = snap_norm(mask, markers_norm[b], size, grid_scale)
+    return s, t, s == t or same_component(mask, s, t)
+
+
+def _cells_entry(cells, cost, a: str, b: str, markers_norm: dict, size, grid_scale: int):
+    """Table entry for a searched cell path, ending exactly on the pins."""
+    if not cells:
+        return _entry([], None)
+    w0, h0 = size
+    path = [(cx * grid_scale / w0, cy * grid_scale / h0) for cx, cy in cells]
+    path[0], path[-1] = tuple(markers_norm[a]), tuple(markers_norm[b])
+    return _entry(path, cost * grid_scale)
+
+
+def _save(key: str, routes: dict, closures: dict):
+    _TABLES[key] = routes
+    _CLOSURES[key] = closures
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        path = table_path(key)
+        tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+        doc = {
+            "key": key, "format": TABLE_FORMAT, "routes": routes,
+            "closures": {k: [list(p) for p in v] for k, v in closures.items()},
+        }
+        tmp.write_text(json.dumps(doc), encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError:
+        pass  # Table still lives in memory for this run
+
+
+def build_route_table(markers_norm: dict, pil_image, grid_scale: int = 3,
+                      sat_max: int = 40, val_min: int = 200) -> dict:
+    """Route every pair of houses (A*, 4-connected) and save the table to data/cache."""
+    key = table_key(markers_norm, pil_image, grid_scale, sat_max, val_min)
+    closures = load_closures()
+    mask = routing_mask(pil_image, grid_scale, sat_max, val_min, closures)
+    size = pil_image.size
+    routes = {}
+    for a, b in combinations(sorted(markers_norm), 2):
+        s, t, joined = _snap_pair(mask, a, b, markers_norm, size, grid_scale)
+        cells, cost = search(mask, s, t) if joined else ([], None)
+        routes[_pair_id(a, b)] = _cells_entry(cells, cost, a, b, markers_norm, size, grid_scale)
+    _save(key, routes, closures)
+    return routes
+
+
+# ------------------ Repair ------------------
+def _path_cells(path, image_size, grid_scale: int, shape):
+    """Grid cells a normalized route passes through (sampled every half cell)."""
+    H, W = shape
+    w0, h0 = image_size
+    pts = np.array(path, dtype=float) * (w0 / grid_scale, h0 / grid_scale)
+    xs, ys = [pts[:1, 0]], [pts[:1, 1]]
+    for (ax, ay), (bx, by) in zip(pts, pts[1:]):
+        n = int(max(abs(bx - ax), abs(by - ay)) * 2) + 1
+        f = np.arange(1, n + 1) / n
+        xs.append(ax + (bx - ax) * f)
+        ys.append(ay + (by - ay) * f)
+    x = np.clip(np.rint(np.concatenate(xs)).astype(int), 0, W - 1)
+    y = np.clip(np.rint(np.concatenate(ys)).astype(int), 0, H - 1)
+    return x, y
+
+
+def _repair(key: str, markers_norm: dict, pil_image, grid_scale: int,
+            sat_max: int, val_min: int) -> dict:
+    """
+    Bring a table in line with closures.json. Routes are searched again
+    only if they cross a newly closed cell (or, when a closure was lifted,
+    if they could now be shorter, which is any route).
+    """
+    routes = dict(get_table(key))
+    old, new = _CLOSURES.get(key, {}), load_closures()
+    base = load_walk_mask(pil_image, grid_scale, sat_max, val_min)
+    size = pil_image.size
+    was_closed = closed_cells(old, base.shape, size, grid_scale) & base
+    now_closed = closed_cells(new, base.shape, size, grid_scale) & base
+    lifted = (was_closed & ~now_closed).any()
+    # One cell of slack: route points are rounded onto the grid
+    added = now_closed & ~was_closed
+    rows = added.copy()
+    rows[1:] |= added[:-1]
+    rows[:-1] |= added[1:]
+    grown = rows.copy()
+    grown[:, 1:] |= rows[:, :-1]
+    grown[:, :-1] |= rows[:, 1:]
+
+    mask = routing_mask(pil_image, grid_scale, sat_max, val_min, new)
+    for pair, entry in routes.items():
+        path = decode(entry["line"])
+        if not lifted:
+            if entry["dist"] is None:
+                continue  # Closing more can't connect it
+            x, y = _path_cells(path, size, grid_scale, base.shape)
+            if not grown[y, x].any():
+                continue
+
+        a, b = pair.split("|")
+        s, t, joined = _snap_pair(mask, a, b, markers_norm, size, grid_scale)
+        if not joined:
+            routes[pair] = _entry([], None)
+            continue
+
+        hit = _PLANNERS.get((key, pair))
+        if hit is not None and (hit[0].s, hit[0].t) == (s, t):
+            planner, seen = hit
+            ys, xs = np.nonzero(seen != mask)
+            planner.update_mask(mask, zip(xs.tolist(), ys.tolist()))
+        else:
+            planner = LpaStar(mask, s, t)
+        _PLANNERS[(key, pair)] = (planner, mask)
+
+        cells, cost = planner.compute()
+        routes[pair] = _cells_entry(cells, cost, a, b, markers_norm, size, grid_scale)
+
+    _save(key, routes, new)
+    return routes
+
+
+def repair_route_table(markers_norm: dict, pil_image, grid_scale: int = 3,
+                       sat_max: int = 40, val_min: int = 200) -> dict:
+    """Update the cached table after a closures.json edit (builds it if missing)."""
+    key = table_key(markers_norm, pil_image, grid_scale, sat_max, val_min)
+    with _LOCK:
+        if get_table(key) is None:
+            return build_route_table(markers_norm, pil_image, grid_scale, sat_max, val_min)
+        if not is_stale(key):
+            return get_table(key)
+        return _repair(key, markers_norm, pil_image, grid_scale, sat_max, val_min)
+
+
+def warm_route_table(markers_norm: dict, pil_image, grid_scale: int = 3,
+                     sat_max: int = 40, val_min: int = 200):
+    """
+    Build (or repair, after a closures edit) the route table in a
+    background thread if it isn't up to date.
+
+    Returns:
+        threading.Thread | None: The worker thread, or None if already cached.
+    """
+    key = table_key(markers_norm, pil_image, grid_scale, sat_max, val_min)
+    if get_table(key) is not None and not is_stale(key):
+        return None
+    th = threading.Thread(
+        target=repair_route_table,
+        args=(dict(markers_norm), pil_image, grid_scale, sat_max, val_min),
+        daemon=True,
+    )
+    th.start()
+    return th
+
+
+if __name__ == "__main__":
+    from PIL import Image
+    from utils import find_map_image, load_markers_norm, MAP_PATH
+
+    img = Image.open(find_map_image() or MAP_PATH)
+    table = build_route_table(load_markers_norm(), img)
+    print(f"Built {len(table)} routes -> {table_path(table_key(load_markers_norm(), img))}")
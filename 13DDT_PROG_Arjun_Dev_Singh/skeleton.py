@@ -0,0 +1,343 @@
+"""
+Walkway skeleton graph.
+
+The walkable mask is thinned (Zhang-Suen) down to one-pixel centre lines,
+and those lines are turned into a sparse graph: nodes are junctions and
+dead ends, edges are the pixel runs between them. The graph is saved
+under data/cache, so routing searches a few thousand graph nodes
+instead of every walkway cell.
+
+Start and goal cells are attached to the skeleton by a short walk over
+walkable cells to the nearest skeleton pixel, which splits the edge it
+lands on. Skeleton paths follow the middle of each walkway, so they are
+a little longer than grid-optimal routes and always 8-connected.
+"""
+
+from collections import deque
+import heapq
+import math
+
+import numpy as np
+
+from walkways import CACHE_DIR, CHECK_EVERY, checkpoint, mask_cells, mask_digest
+
+SQRT2 = math.sqrt(2)
+GRAPH_FORMAT = 2  # Bump when graph building changes, so old cache files are ignored
+
+_SKELETONS = {}  # id(mask) -> (mask, SkeletonGraph)
+
+
+# ------------------ Thinning ------------------
+def thin(mask):
+    """Zhang-Suen thinning of a bool mask (vectorised)."""
+    img = np.pad(mask, 1).astype(np.uint8)
+    while True:
+        changed = False
+        for step in (0, 1):
+            c = img[1:-1, 1:-1]
+            p2, p3, p4 = img[:-2, 1:-1], img[:-2, 2:], img[1:-1, 2:]
+            p5, p6, p7 = img[2:, 2:], img[2:, 1:-1], img[2:, :-2]
+            p8, p9 = img[1:-1, :-2], img[:-2, :-2]
+            ring = (p2, p3, p4, p5, p6, p7, p8, p9, p2)
+            b = sum(ring[:8])
+            a = sum(((ring[i] == 0) & (ring[i + 1] == 1)).astype(np.uint8) for i in range(8))
+            if step == 0:
+                side = (p2 * p4 * p6 == 0) & (p4 * p6 * p8 == 0)
+            else:
+                side = (p2 * p4 * p8 == 0) & (p2 * p6 * p8 == 0)
+            remove = (c == 1) & (b >= 2) & (b <= 6) & (a == 1) & side
+            if remove.any():
+                c[remove] = 0
+                changed = True
+        if not changed:
+            return img[1:-1, 1:-1].astype(bool)
+
+
+# ------------------ Graph ------------------
+class SkeletonGraph:
+    """Junction/segment graph of a thinned walkway mask."""
+
+    def __init__(self):
+        self.nodes = []    # id -> (x, y)
+        self.edges = []    # id -> (node a, node b)
+        self.lengths = []  # id -> walk length in cells
+        self.pixels = []   # id -> [(x, y), ...] from node a to node b
+        self.adj = {}      # node -> [(neighbour, edge id)]
+        self.where = {}    # skeleton pixel -> ("node", id) or ("edge", id, index)
+        self.cum = []      # id -> cumulative length along pixels
+
+    def _index(self):
+        """Rebuild adjacency and pixel lookups after nodes/edges change."""
+        self.adj = {i: [] for i in range(len(self.nodes))}
+        self.where = {}
+        self.cum = []
+        for e, (a, b) in enumerate(self.edges):
+            self.adj[a].append((b, e))
+            self.adj[b].append((a, e))
+            pix = self.pixels[e]
+            cum = [0.0]
+            for (x0, y0), (x1, y1) in zip(pix, pix[1:]):
+                cum.append(cum[-1] + (SQRT2 if x0 != x1 and y0 != y1 else 1.0))
+            self.cum.append(cum)
+            for i, p in enumerate(pix[1:-1], start=1):
+                self.where[p] = ("edge", e, i)
+        for i, p in enumerate(self.nodes):
+            self.where[p] = ("node", i)
+        return self
+
+    # ---- building ----
+    def build(self, mask):
+        """Thin the mask and trace junction-to-junction segments."""
+        skel = thin(mask)
+        on = set(map(tuple, np.argwhere(skel)[:, ::-1].tolist()))
+        H, W = mask.shape
+        walk = mask_cells(mask)
+
+        def open_cell(x, y):
+            return 0 <= x < W and 0 <= y < H and walk[y * W + x] == 1
+
+        def neighbours(p):
+            # Diagonal links need both orthogonal cells open (the same
+            # no-corner-cutting rule as pathfinding.astar)
+            x, y = p
+            return [(x + dx, y + dy) for dy in (-1, 0, 1) for dx in (-1, 0, 1)
+                    if (dx or dy) and (x + dx, y + dy) in on
+                    and (not (dx and dy) or open_cell(x + dx, y) and open_cell(x, y + dy))]
+
+        node_of = {}
+        for p in sorted(on, key=lambda p: (p[1], p[0])):
+            if len(neighbours(p)) != 2:
+                node_of[p] = len(self.nodes)
+                self.nodes.append(p)
+
+        visited = set()  # degree-2 pixels already on an edge
+
+        def trace(start, first):
+            pix = [start, first]
+            prev, cur = start, first
+            while cur not in node_of:
+                visited.add(cur)
+                nxt = [n for n in neighbours(cur) if n != prev and n not in visited]
+                if not nxt:
+                    # Closed loop back to the start, or a dangling pixel
+                    back = [n for n in neighbours(cur) if n in node_of and n != prev]
+                    if not back:
+                        return None
+                    nxt = back
+                # Prefer stepping straight onto a node when one is adjacent
+                nodes_next = [n for n in nxt if n in node_of]
+                prev, cur = cur, (nodes_next or nxt)[0]
+                pix.append(cur)
+            return pix
+
+        def add_edges_from(n):
+            for first in neighbours(n):
+                if first in node_of:
+                    if node_of[first] > node_of[n]:
+                        self._add_edge(node_of[n], node_of[first], [n, first])
+                    continue
+                if first in visited:
+                    continue
+                pix = trace(n, first)
+                if pix:
+                    self._add_edge(node_of[n], node_of[pix[-1]], pix)
+
+        for n in list(self.nodes):
+            add_edges_from(n)
+
+        # Pure loops have no junctions: promote one pixel to a node
+        for p in sorted(on):
+            if p in node_of or p in visited:
+                continue
+            node_of[p] = len(self.nodes)
+            self.nodes.append(p)
+            add_edges_from(p)
+
+        return self._index()
+
+    def _add_edge(self, a, b, pix):
+        self.edges.append((a, b))
+        self.pixels.append(pix)
+        self.lengths.append(sum(
+            SQRT2 if x0 != x1 and y0 != y1 else 1.0
+            for (x0, y0), (x1, y1) in zip(pix, pix[1:])
+        ))
+
+    # ---- persistence ----
+    def save(self, path):
+        offsets = np.cumsum([0] + [len(p) for p in self.pixels])
+        flat = [p for pix in self.pixels for p in pix]
+        np.savez_compressed(
+            path,
+            nodes=np.array(self.nodes, dtype=np.int32).reshape(-1, 2),
+            edges=np.array(self.edges, dtype=np.int32).reshape(-1, 2),
+            lengths=np.array(self.lengths, dtype=np.float64),
+            pixels=np.array(flat, dtype=np.int32).reshape(-1, 2),
+            offsets=offsets.astype(np.int64),
+        )
+
+    def load(self, path):
+        with np.load(path) as z:
+            self.nodes = [tuple(p) for p in z["nodes"].tolist()]
+            self.edges = [tuple(e) for e in z["edges"].tolist()]
+            self.lengths = z["lengths"].tolist()
+            flat = [tuple(p) for p in z["pixels"].tolist()]
+            off = z["offsets"].tolist()
+        self.pixels = [flat[off[i]:off[i + 1]] for i in range(len(self.edges))]
+        return self._index()
+
+    # ---- pieces of edges ----
+    def piece(self, e, i, j):
+        """Pixels of edge e from index i to index j (either direction)."""
+        pix = self.pixels[e]
+        return pix[i:j + 1] if i <= j else pix[j:i + 1][::-1]
+
+
+def get_skeleton(mask) -> SkeletonGraph:
+    """Return the skeleton graph for a mask (memory, then disk, then build)."""
+    hit = _SKELETONS.get(id(mask))
+    if hit is not None and hit[0] is mask:
+        return hit[1]
+
+    path = CACHE_DIR / f"skel{GRAPH_FORMAT}_{mask_digest(mask)[:16]}.npz"
+    try:
+        graph = SkeletonGraph().load(path)
+    except Exception:
+        graph = SkeletonGraph().build(mask)
+        try:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            graph.save(path)
+        except OSError:
+            pass
+
+    _SKELETONS[id(mask)] = (mask, graph)
+    return graph
+
+
+# ------------------ Routing ------------------
+def _walk_to(mask, cell, is_goal):
+    """BFS over walkable cells from cell to the nearest cell where is_goal holds."""
+    H, W = mask.shape
+    cells = mask_cells(mask)
+    came = {cell: None}
+    q = deque([cell])
+    while q:
+        cur = q.popleft()
+        if is_goal(cur):
+            path = []
+            while cur is not None:
+                path.append(cur)
+                cur = came[cur]
+            return path[::-1]
+        x, y = cur
+        for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+            nx, ny = x + dx, y + dy
+            if (nx, ny) not in came and 0 <= nx < W and 0 <= ny < H and cells[ny * W + nx]:
+                came[(nx, ny)] = cur
+                q.append((nx, ny))
+    return None
+
+
+def skeleton_search(mask, s, t, diagonal=False, stats=None, cancel=None):
+    """
+    Skeleton-graph engine with the same interface as pathfinding.astar.
+
+    diagonal is accepted for compatibility; skeleton segments are always
+    8-connected pixel runs.
+    """
+    if s == t:
+        return [s], 0
+    graph = get_skeleton(mask)
+    lead_in = _walk_to(mask, s, graph.where.__contains__)
+    lead_out = _walk_to(mask, t, graph.where.__contains__)
+    if stats is not None:
+        stats["expanded"] = 0
+        stats["graph_nodes"] = len(graph.nodes)
+    if lead_in is None or lead_out is None:
+        # Tiny walkway patch that thinned away entirely: walk it directly
+        cells = _walk_to(mask, s, t.__eq__)
+        return (cells, len(cells) - 1) if cells else ([], None)
+
+    START, GOAL = -1, -2
+
+    def links(p):
+        """(node, cost, piece) for where p sits on the graph; a piece is
+        (edge, from index, to index) or None when p is the node itself."""
+        loc = graph.where[p]
+        if loc[0] == "node":
+            return [(loc[1], 0.0, None)]
+        _, e, i = loc
+        a, b = graph.edges[e]
+        cum = graph.cum[e]
+        last = len(cum) - 1
+        return [(a, cum[i], (e, i, 0)), (b, cum[last] - cum[i], (e, i, last))]
+
+    out_s = links(lead_in[-1])
+    into_t = {n: (c, piece and (piece[0], piece[2], piece[1]))
+              for n, c, piece in links(lead_out[-1])}
+
+    def h(u):
+        """Octile distance to the goal pixel (skeleton steps are 8-connected)."""
+        (ax, ay), (bx, by) = (lead_in[-1] if u == START else t if u == GOAL else graph.nodes[u]), t
+        dx, dy = abs(ax - bx), abs(ay - by)
+        return max(dx, dy) + (SQRT2 - 1) * min(dx, dy)
+
+    # A* over the skeleton graph, from the start attachment to the goal's
+    g = {START: 0.0}
+    came = {START: None}
+    frontier = [(0.0, START)]
+    done = set()
+
+    def relax(u, v, c, piece):
+        nv = g[u] + c
+        if v not in g or nv < g[v]:
+            g[v] = nv
+            came[v] = (u, piece)
+            heapq.heappush(frontier, (nv + h(v), v))
+
+    loc_s, loc_t = graph.where[lead_in[-1]], graph.where[lead_out[-1]]
+    if loc_s[0] == "edge" and loc_t[0] == "edge" and loc_s[1] == loc_t[1]:
+        e, i, j = loc_s[1], loc_s[2], loc_t[2]
+        relax(START, GOAL, abs(graph.cum[e][j] - graph.cum[e][i]), (e, i, j))
+
+    while frontier:
+        _, u = heapq.heappop(frontier)
+        if u in done:
+            continue
+        done.add(u)
+        if len(done) % CHECK_EVERY == 0:
+            checkpoint(cancel, stats, len(done))
+        if u == GOAL:
+            break
+        if u == START:
+            for n, c, piece in out_s:
+                relax(START, n, c, piece)
+            continue
+        if u in into_t:
+            c, piece = into_t[u]
+            relax(u, GOAL, c, piece)
+        for v, e in graph.adj[u]:
+            last = len(graph.cum[e]) - 1
+            relax(u, v, graph.lengths[e], (e, 0, last) if graph.edges[e][0] == u else (e, last, 0))
+
+    if stats is not None:
+        stats["expanded"] = len(done)
+    if GOAL not in came:
+        return [], None
+
+    # Stitch: lead-in walk, skeleton pieces, lead-out walk
+    pieces = []
+    cur = GOAL
+    while came[cur] is not None:
+        prev, piece = came[cur]
+        if piece is not None:
+            pieces.append(graph.piece(*piece))
+        cur = prev
+    cells = list(lead_in)
+    for pix in reversed(pieces):
+        cells.extend(pix[1:] if cells[-1] == pix[0] else pix)
+    tail = lead_out[::-1]
+    cells.extend(tail[1:] if cells[-1] == tail[0] else tail)
+
+    cost = g[GOAL] + (len(lead_in) - 1) + (len(lead_out) - 1)
+    return cells, cost
@@ -0,0 +1,102 @@
+"""
+Spatial lookup and label placement for map pins.
+
+GridIndex buckets points into square cells so the viewer can ask for just
+the pins inside the viewport, nearest the viewport centre first, so the
+pins kept under MAX_PINS are the same from frame to frame. place_labels
+greedily keeps the labels that fit without overlapping, highest priority
+first. Together they bound how many canvas items a redraw touches,
+however many houses and room codes are loaded.
+"""
+
+from collections import defaultdict
+import math
+
+CELL = 64              # Grid cell edge in image pixels
+ROOM_MIN_SCALE = 1.5   # Room pins appear from this zoom upwards
+MAX_PINS = 400         # Pins drawn per frame (houses first)
+MAX_LABELS = 120       # Labels drawn per frame
+CHAR_W, LABEL_H = 7, 16  # Rough label metrics for 10 pt Segoe UI
+
+# Label positions tried around a pin, as (dx, dy, anchor)
+LABEL_SLOTS = [(10, -12, "w"), (10, 12, "w"), (-10, -12, "e"), (-10, 12, "e")]
+
+
+class GridIndex:
+    """Uniform-grid index over named points in image pixels."""
+
+    def __init__(self, points: dict, cell: int = CELL):
+        self.cell = cell
+        self.points = dict(points)
+        self.cells = defaultdict(list)
+        for name, (x, y) in self.points.items():
+            self.cells[(int(x // cell), int(y // cell))].append(name)
+
+    def query(self, x0, y0, x1, y1, centre=None):
+        """
+        Names of the points inside the rectangle. With a centre (x, y) they
+        are sorted by distance to it, ties by name; otherwise in no
+        particular order.
+        """
+        c = self.cell
+        cx0, cy0 = math.floor(x0 / c), math.floor(y0 / c)
+        cx1, cy1 = math.floor(x1 / c), math.floor(y1 / c)
+        out = []
+        # Walk whichever is smaller: the cells in the box or the occupied cells
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) <= len(self.cells):
+            keys = ((cx, cy) for cy in range(cy0, cy1 + 1) for cx in range(cx0, cx1 + 1))
+        else:
+            keys = (k for k in self.cells if cx0 <= k[0] <= cx1 and cy0 <= k[1] <= cy1)
+        for key in keys:
+            for name in self.cells.get(key, ()):
+                x, y = self.points[name]
+                if x0 <= x <= x1 and y0 <= y <= y1:
+                    out.append(name)
+        if centre is not None:
+            cx, cy = centre
+            out.sort(key=lambda n: ((self.points[n][0] - cx) ** 2 + (self.points[n][1] - cy) ** 2, n))
+        return out
+
+
+def label_box(cx, cy, text, slot):
+    """Screen rectangle a label would cover at a slot around (cx, cy)."""
+    dx, dy, anchor = slot
+    w = CHAR_W * len(text) + 4
+    x = cx + dx
+    x0, x1 = (x, x + w) if anchor == "w" else (x - w, x)
+    return x0, cy + dy - LABEL_H / 2, x1, cy + dy + LABEL_H / 2
+
+
+def place_labels(pins, limit: int = MAX_LABELS):
+    """
+    Greedy label collision avoidance.
+
+    Args:
+        pins (list): (name, cx, cy) in screen pixels, most important first.
+        limit (int): Most labels to place.
+
+    Returns:
+        dict: name -> slot index into LABEL_SLOTS for the labels that fit.
+    """
+    placed = {}
+    taken = defaultdict(list)  # Coarse grid over accepted label boxes
+    g = 64
+
+    def cells(box):
+        for gy in range(int(box[1] // g), int(box[3] // g) + 1):
+            for gx in range(int(box[0] // g), int(box[2] // g) + 1):
+                yield gx, gy
+
+    for name, cx, cy in pins:
+        if len(placed) >= limit:
+            break
+        for i, slot in enumerate(LABEL_SLOTS):
+            box = label_box(cx, cy, name, slot)
+            clash = any(b[0] < box[2] and box[0] < b[2] and b[1] < box[3] and box[1] < b[3]
+                        for c in cells(box) for b in taken[c])
+            if not clash:
+                placed[name] = i
+                for c in cells(box):
+                    taken[c].append(box)
+                break
+    return placed
@@ -0,0 +1,62 @@
+"""
+Shared fixtures. The modules live flat in the project folder, so it goes
+on sys.path; caches and closures.json are redirected to a temp folder so
+tests never read or write data/.
+"""
+
+from pathlib import Path
+import sys
+
+import numpy as np
+from PIL import Image
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import hpa
+import route_table
+import skeleton
+import walkways
+
+
+@pytest.fixture(autouse=True)
+def temp_cache(tmp_path, monkeypatch):
+    for module in (walkways, route_table, hpa, skeleton):
+        monkeypatch.setattr(module, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(walkways, "CLOSURES_PATH", tmp_path / "closures.json")
+    monkeypatch.setattr(walkways, "_MASKS", {})
+    monkeypatch.setattr(route_table, "_TABLES", {})
+    monkeypatch.setattr(route_table, "_CLOSURES", {})
+    monkeypatch.setattr(route_table, "_PLANNERS", {})
+    return tmp_path
+
+
+@pytest.fixture
+def campus():
+    """Seven house pins on a small in-memory map; some pairs are disconnected."""
+    rng = np.random.default_rng(8)
+    img = map_image(rng.random((30, 40)) < 0.6)
+    markers = {f"H{i}": tuple(p) for i, p in enumerate(rng.uniform(0.05, 0.95, (7, 2)).tolist())}
+    return img, markers
+
+
+def random_grid(rng, lo: int = 8, hi: int = 40):
+    """Random walkable mask with a random share of open cells."""
+    H, W = (int(v) for v in rng.integers(lo, hi, 2))
+    return rng.random((H, W)) < rng.uniform(0.55, 0.85)
+
+
+def random_open_pair(rng, mask):
+    """Two distinct walkable cells as (x, y), or None if there aren't two."""
+    cells = np.argwhere(mask)
+    if len(cells) < 2:
+        return None
+    a, b = cells[rng.choice(len(cells), 2, replace=False)]
+    return (int(a[1]), int(a[0])), (int(b[1]), int(b[0]))
+
+
+def map_image(mask, grid_scale: int = 3):
+    """In-memory map of mask (white walkways on red); its walkway grid is close, not exact."""
+    rgb = np.where(mask[..., None], 255, np.array([200, 40, 40])).astype(np.uint8)
+    H, W = mask.shape
+    return Image.fromarray(rgb).resize((W * grid_scale, H * grid_scale), Image.NEAREST)
@@ -0,0 +1,44 @@
+import pytest
+
+from batch_routing import route_batch
+from route_table import build_route_table
+from utils import raster_route_with_cost
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_batch_dedupes_and_keeps_order(campus, workers):
+    img, markers = campus
+    pin = markers["H1"]  # A bare point on the H1 pin
+    pairs = [("H3", "H5"), ("H5", "H3"), ("H1", "H4"), ("H0", "H1"),
+             ("H3", "H5"), (pin, "H6"), ("H6", pin), ("H4", "H4")]
+    results = route_batch(pairs, markers, img, workers=workers, use_table=False)
+
+    assert [(r["from"], r["to"]) for r in results] == pairs
+    assert [r["source"] for r in results] == [
+        "search", "duplicate", "search", "disconnected",
+        "duplicate", "search", "duplicate", "search",
+    ]
+    for (a, b), r in zip(pairs, results):
+        a, b = ("H1" if end is pin else end for end in (a, b))
+        dist = raster_route_with_cost(a, b, markers, img)[1] if a != b else 0
+        if dist is None:
+            assert (r["path"], r["dist"]) == ([], None)
+            continue
+        assert r["dist"] == pytest.approx(dist)
+        assert r["path"][0] == markers[a] and r["path"][-1] == markers[b]
+        if r["source"] == "duplicate":
+            assert r["seconds"] == 0.0
+
+    # Repeats share the first result's path, reversed where the ends swap
+    assert results[1]["path"] == results[0]["path"][::-1]
+    assert results[4]["path"] == results[0]["path"]
+    assert results[6]["path"] == results[5]["path"][::-1]
+
+
+def test_batch_answers_house_pairs_from_the_table(campus):
+    img, markers = campus
+    build_route_table(markers, img)
+    pairs = [("H3", "H5"), (markers["H3"], "H5")]
+    results = route_batch(pairs, markers, img, workers=0)
+    assert [r["source"] for r in results] == ["table", "duplicate"]
+    assert results[0]["dist"] == pytest.approx(raster_route_with_cost("H3", "H5", markers, img)[1])
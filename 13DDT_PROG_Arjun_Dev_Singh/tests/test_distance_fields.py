@@ -0,0 +1,49 @@
+from collections import deque
+
+import numpy as np
+
+from conftest import random_grid, random_open_pair
+from distance_fields import NO_PRED, backtrack, flood_field, reached
+
+
+def bfs_dist(mask, start):
+    H, W = mask.shape
+    dist = np.full((H, W), -1)
+    dist[start[1], start[0]] = 0
+    q = deque([start])
+    while q:
+        x, y = q.popleft()
+        for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            if 0 <= nx < W and 0 <= ny < H and mask[ny, nx] and dist[ny, nx] < 0:
+                dist[ny, nx] = dist[y, x] + 1
+                q.append((nx, ny))
+    return dist
+
+
+def test_flood_matches_bfs_and_backtracks():
+    rng = np.random.default_rng(17)
+    for _ in range(30):
+        mask = random_grid(rng)
+        pair = random_open_pair(rng, mask)
+        if pair is None:
+            continue
+        s, t = pair
+        pred = flood_field(mask, s)
+        expected = bfs_dist(mask, s)
+        H, W = mask.shape
+        assert all(reached(pred, s, (x, y)) == (expected[y, x] >= 0)
+                   for y in range(H) for x in range(W))
+        if expected[t[1], t[0]] >= 0:
+            cells = backtrack(pred, t)
+            assert cells[0] == s and cells[-1] == t
+            assert len(cells) - 1 == expected[t[1], t[0]]
+            assert all(mask[y, x] for x, y in cells)
+        else:
+            assert pred[t[1], t[0]] == NO_PRED
+
+
+def test_flood_from_blocked_cell_reaches_nothing():
+    mask = np.array([[0, 1], [1, 1]], dtype=bool)
+    pred = flood_field(mask, (0, 0))
+    assert pred.dtype == np.uint8 and (pred == NO_PRED).all()
+    assert not reached(pred, (0, 0), (1, 1))
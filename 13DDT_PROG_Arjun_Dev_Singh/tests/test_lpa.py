@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from conftest import random_grid, random_open_pair
+from lpa import LpaStar
+from pathfinding import astar
+
+
+def assert_matches_astar(planner, mask, s, t, diagonal):
+    cells, cost = planner.compute()
+    _, best = astar(mask, s, t, diagonal)
+    if best is None:
+        assert (cells, cost) == ([], None)
+    else:
+        assert cost == pytest.approx(best)
+        assert cells[0] == s and cells[-1] == t
+        assert all(mask[y, x] for x, y in cells)
+
+
+@pytest.mark.parametrize("diagonal", [False, True])
+def test_repair_matches_fresh_search(diagonal):
+    rng = np.random.default_rng(11 + diagonal)
+    for _ in range(30):
+        mask = random_grid(rng)
+        pair = random_open_pair(rng, mask)
+        if pair is None:
+            continue
+        s, t = pair
+        planner = LpaStar(mask, s, t, diagonal)
+        assert_matches_astar(planner, mask, s, t, diagonal)
+
+        # A few rounds of random closures and reopenings
+        for _ in range(4):
+            flip = rng.random(mask.shape) < 0.05
+            flip[s[1], s[0]] = flip[t[1], t[0]] = False
+            new = mask ^ flip
+            ys, xs = np.nonzero(flip)
+            planner.update_mask(new, zip(xs.tolist(), ys.tolist()))
+            mask = new
+
+            assert_matches_astar(planner, mask, s, t, diagonal)
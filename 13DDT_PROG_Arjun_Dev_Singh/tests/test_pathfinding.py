@@ -0,0 +1,116 @@
+import math
+
+import numpy as np
+import pytest
+
+from conftest import random_grid, random_open_pair
+from hpa import _descend, _relax
+from pathfinding import ENGINES, WEIGHTED, search
+
+EXACT = ("astar", "bidir", "jps")
+APPROX = ("hpa", "skeleton")
+ALWAYS_8 = ("skeleton",)  # Skeleton segments are 8-connected whatever diagonal says
+
+
+def path_cost(mask, cells, diagonal):
+    """Length of a cell path, checking every step is legal on the grid."""
+    H, W = mask.shape
+    cost = 0.0
+    for (x, y) in cells:
+        assert 0 <= x < W and 0 <= y < H and mask[y, x], f"blocked cell {(x, y)}"
+    for (x0, y0), (x1, y1) in zip(cells, cells[1:]):
+        dx, dy = x1 - x0, y1 - y0
+        assert max(abs(dx), abs(dy)) == 1, f"jump {(x0, y0)} -> {(x1, y1)}"
+        if dx and dy:
+            assert diagonal, "diagonal step on a 4-connected grid"
+            assert mask[y0, x1] and mask[y1, x0], f"corner cut at {(x0, y0)} -> {(x1, y1)}"
+            cost += math.sqrt(2)
+        else:
+            cost += 1
+    return cost
+
+
+def cases(n, seed):
+    rng = np.random.default_rng(seed)
+    out = []
+    while len(out) < n:
+        mask = random_grid(rng)
+        pair = random_open_pair(rng, mask)
+        if pair:
+            out.append((mask, *pair))
+    return out
+
+
+@pytest.mark.parametrize("diagonal", [False, True])
+@pytest.mark.parametrize("engine", EXACT + APPROX)
+def test_engine_matches_astar(engine, diagonal):
+    for mask, s, t in cases(60, seed=1 + diagonal):
+        _, best = search(mask, s, t, "astar", diagonal)
+        cells, cost = search(mask, s, t, engine, diagonal)
+        assert (cost is None) == (best is None)
+        if cost is None:
+            assert cells == []
+            continue
+        assert cells[0] == s and cells[-1] == t
+        assert path_cost(mask, cells, diagonal or engine in ALWAYS_8) == pytest.approx(cost)
+        if engine in EXACT:
+            assert cost == pytest.approx(best)
+        else:
+            # Approximate engines never beat the optimum for the moves they make
+            if engine in ALWAYS_8:
+                best = search(mask, s, t, "astar", True)[1]
+            assert cost >= best - 1e-9
+
+
+@pytest.mark.parametrize("epsilon", [1.5, 3.0])
+@pytest.mark.parametrize("engine", sorted(WEIGHTED))
+def test_weighted_within_epsilon(engine, epsilon):
+    for mask, s, t in cases(40, seed=7):
+        _, best = search(mask, s, t, "astar", True)
+        cells, cost = search(mask, s, t, engine, True, epsilon=epsilon)
+        assert (cost is None) == (best is None)
+        if cost is not None:
+            assert path_cost(mask, cells, True) == pytest.approx(cost)
+            assert best - 1e-9 <= cost <= epsilon * best + 1e-9
+
+
+def test_no_corner_cutting():
+    # Two open cells touching only at a corner are not connected
+    mask = np.array([[1, 0], [0, 1]], dtype=bool)
+    for engine in EXACT + APPROX:
+        assert search(mask, (0, 0), (1, 1), engine, diagonal=True) == ([], None)
+
+
+@pytest.mark.parametrize("diagonal", [False, True])
+def test_hpa_cluster_distances_match_astar(diagonal):
+    rng = np.random.default_rng(4 + diagonal)
+    for _ in range(10):
+        sub = rng.random((16, 16)) < 0.7
+        sources = [tuple(int(v) for v in c[::-1]) for c in np.argwhere(sub)[:3]]
+        dist = _relax(sub, sources, diagonal)
+        for i, s in enumerate(sources):
+            for x, y in rng.integers(0, 16, (20, 2)).tolist():
+                _, best = search(sub, s, (x, y), "astar", diagonal)
+                if best is None:
+                    assert dist[i, y, x] == math.inf
+                    continue
+                assert dist[i, y, x] == pytest.approx(best)
+                cells = _descend(dist[i], sub, (x, y), diagonal)
+                assert cells[-1] == s
+                assert path_cost(sub, cells, diagonal) == pytest.approx(best)
+
+
+def test_search_rejects_bad_arguments():
+    mask = np.ones((4, 4), dtype=bool)
+    with pytest.raises(ValueError):
+        search(mask, (0, 0), (3, 3), "nope")
+    with pytest.raises(ValueError):
+        search(mask, (0, 0), (3, 3), epsilon=0.5)
+    with pytest.raises(ValueError):
+        search(mask, (0, 0), (3, 3), "hpa", epsilon=2.0)
+    with pytest.raises(ValueError):
+        search(mask, (0, 0), (3, 3), "bidir", epsilon=2.0)
+
+
+def test_every_engine_is_tested():
+    assert sorted(EXACT + APPROX) == sorted(ENGINES)
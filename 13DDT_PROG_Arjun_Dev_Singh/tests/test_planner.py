@@ -0,0 +1,30 @@
+from itertools import permutations
+import math
+
+import numpy as np
+import pytest
+
+from planner import _path_cost, order_exact, order_heuristic
+
+
+def brute_force(dist):
+    n = len(dist)
+    return min(_path_cost([0, *rest], dist) for rest in permutations(range(1, n)))
+
+
+@pytest.mark.parametrize("n", range(1, 7))
+def test_held_karp_matches_brute_force(n):
+    rng = np.random.default_rng(n)
+    for _ in range(20):
+        dist = rng.uniform(1, 100, (n, n)).tolist()  # Asymmetric on purpose
+        order = order_exact(dist)
+        assert sorted(order) == list(range(n)) and order[0] == 0
+        assert _path_cost(order, dist) == pytest.approx(brute_force(dist))
+
+
+def test_heuristic_visits_every_stop_once():
+    rng = np.random.default_rng(0)
+    pts = rng.uniform(0, 1, (15, 2))
+    dist = [[math.dist(a, b) for b in pts] for a in pts]
+    order = order_heuristic(dist)
+    assert order[0] == 0 and sorted(order) == list(range(15))
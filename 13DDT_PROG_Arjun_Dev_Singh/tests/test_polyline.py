@@ -0,0 +1,31 @@
+import numpy as np
+
+from polyline import PRECISION, collapse_collinear, decode, douglas_peucker, encode
+
+
+def test_encode_decode_round_trip():
+    rng = np.random.default_rng(3)
+    for n in (0, 1, 2, 50):
+        points = [tuple(p) for p in rng.uniform(-1, 2, (n, 2)).tolist()]
+        back = decode(encode(points))
+        assert len(back) == len(points)
+        for (x, y), (bx, by) in zip(points, back):
+            assert abs(x - bx) <= 0.5 * 10 ** -PRECISION + 1e-12
+            assert abs(y - by) <= 0.5 * 10 ** -PRECISION + 1e-12
+
+
+def test_round_trip_is_exact_on_the_precision_grid():
+    points = [(0.12345, 0.5), (0.0, 0.0), (-0.00001, 1.0), (0.99999, 0.25)]
+    assert decode(encode(points)) == points
+
+
+def test_collapse_collinear_keeps_corners():
+    points = [(0, 0), (1, 0), (2, 0), (2, 1), (2, 2)]
+    assert collapse_collinear(points) == [(0, 0), (2, 0), (2, 2)]
+
+
+def test_douglas_peucker_keeps_ends():
+    points = [(x, 0.01 * (x % 2)) for x in range(20)]
+    out = douglas_peucker(points, 0.1)
+    assert out[0] == points[0] and out[-1] == points[-1]
+    assert len(out) < len(points)
@@ -0,0 +1,24 @@
+from PIL import Image
+
+from pyramid import ScalePyramid
+
+
+def test_deferred_base_shows_nothing_until_set():
+    img = Image.new("RGB", (400, 300), "white")
+    pyramid = ScalePyramid(img, defer=True)
+    assert pyramid.nearest(0.5) is None
+    assert pyramid.get(0.5) is None and pyramid.is_pending(0.5)
+
+    pyramid.set_base(img)
+    assert pyramid.nearest(0.5) == (1, img)
+    assert pyramid.get(1) is img
+
+
+def test_preview_serves_until_base_is_set():
+    img = Image.new("RGB", (400, 300), "white")
+    preview = img.resize((100, 75))
+    pyramid = ScalePyramid(img, preview=preview)
+    assert pyramid.nearest(0.5) == (0.25, preview)
+    assert pyramid.get(1) is None
+    pyramid.set_base(img)
+    assert pyramid.get(1) is img
@@ -0,0 +1,56 @@
+from itertools import combinations
+
+import pytest
+
+import route_table
+from route_table import build_route_table, lookup_route
+from utils import raster_route_with_cost
+from walkways import save_closures
+
+
+def assert_table_matches_search(markers, img):
+    """Every pair, both ways, against a fresh search; returns the connected count."""
+    connected = 0
+    for a, b in combinations(sorted(markers), 2):
+        _, expected = raster_route_with_cost(a, b, markers, img)
+        for start, end in ((a, b), (b, a)):
+            path, dist = lookup_route(start, end, markers, img)
+            if expected is None:
+                assert (path, dist) == ([], None)
+                continue
+            assert dist == pytest.approx(expected)
+            assert path[0] == markers[start] and path[-1] == markers[end]
+        connected += expected is not None
+    return connected
+
+
+def test_table_matches_search(campus):
+    img, markers = campus
+    assert lookup_route("H0", "H1", markers, img) is None  # Nothing built yet
+    routes = build_route_table(markers, img)
+    assert len(routes) == 21
+    assert assert_table_matches_search(markers, img) > 0
+
+    # The next run loads the saved table instead of searching again
+    route_table._TABLES.clear()
+    assert assert_table_matches_search(markers, img) > 0
+    assert lookup_route("H0", "H0", markers, img) is None
+
+
+def test_table_follows_closures(campus):
+    img, markers = campus
+    build_route_table(markers, img)
+    path, before = lookup_route("H3", "H5", markers, img)
+
+    # Close a small square on the middle of the H3-H5 route
+    x, y = path[len(path) // 2]
+    r = 0.03
+    save_closures({"works": [(x - r, y - r), (x + r, y - r), (x + r, y + r), (x - r, y + r)]})
+    assert assert_table_matches_search(markers, img) > 0
+    during = lookup_route("H3", "H5", markers, img)[1]
+    assert during is None or during > before
+
+    # Lifting it brings the original routes back
+    save_closures({})
+    assert assert_table_matches_search(markers, img) > 0
+    assert lookup_route("H3", "H5", markers, img)[1] == pytest.approx(before)
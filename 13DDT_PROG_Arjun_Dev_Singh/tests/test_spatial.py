@@ -0,0 +1,32 @@
+import numpy as np
+
+from spatial import GridIndex, label_box, place_labels, LABEL_SLOTS
+
+
+def test_query_matches_brute_force():
+    rng = np.random.default_rng(2)
+    points = {f"p{i}": tuple(v) for i, v in enumerate(rng.uniform(0, 1000, (300, 2)).tolist())}
+    index = GridIndex(points)
+    for _ in range(50):
+        x0, y0 = rng.uniform(-100, 900, 2)
+        x1, y1 = x0 + rng.uniform(0, 400), y0 + rng.uniform(0, 400)
+        expected = {n for n, (x, y) in points.items() if x0 <= x <= x1 and y0 <= y <= y1}
+        assert set(index.query(x0, y0, x1, y1)) == expected
+
+
+def test_query_with_centre_is_nearest_first_and_stable():
+    points = {"far": (90, 90), "b": (10, 0), "a": (0, 10), "near": (1, 1)}
+    index = GridIndex(points, cell=16)
+    order = index.query(-5, -5, 100, 100, centre=(0, 0))
+    assert order == ["near", "a", "b", "far"]  # a and b tie; names break it
+    assert GridIndex(dict(reversed(points.items())), cell=16).query(-5, -5, 100, 100, centre=(0, 0)) == order
+
+
+def test_labels_never_overlap():
+    rng = np.random.default_rng(4)
+    pins = [(f"room{i}", *rng.uniform(0, 600, 2)) for i in range(200)]
+    placed = place_labels(pins)
+    boxes = [label_box(x, y, n, LABEL_SLOTS[placed[n]]) for n, x, y in pins if n in placed]
+    for i, a in enumerate(boxes):
+        for b in boxes[i + 1:]:
+            assert not (a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3])
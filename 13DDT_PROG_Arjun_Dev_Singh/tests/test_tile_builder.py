@@ -0,0 +1,29 @@
+import numpy as np
+from PIL import Image
+import pytest
+
+from conftest import map_image
+from tile_builder import build_tiles, tile_path
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_rebuild_writes_only_changed_tiles(tmp_path, workers):
+    src = tmp_path / "map.png"
+    root = tmp_path / "tiles"
+    map_image(np.random.default_rng(6).random((100, 150)) < 0.7, grid_scale=4).save(src)
+
+    first = build_tiles(src, root, workers=workers)
+    assert first["written"] == len(first["tiles"]) > 0
+    assert all(tile_path(root, *map(int, key.split("/")), "png").exists() for key in first["tiles"])
+
+    assert build_tiles(src, root, workers=workers)["written"] == 0
+
+    # Paint a small patch in the top-left corner: only the tiles over it change
+    with Image.open(src) as img:
+        img = img.copy()
+    img.paste((0, 0, 255), (0, 0, 20, 20))
+    img.save(src)
+    third = build_tiles(src, root, workers=workers)
+    changed = {k for k in first["tiles"] if third["tiles"][k] != first["tiles"][k]}
+    assert third["written"] == len(changed)
+    assert changed == {f"{z}/0/0" for z in range(third["max_zoom"] + 1)}
@@ -0,0 +1,137 @@
+from collections import deque
+
+import numpy as np
+import pytest
+
+from conftest import map_image, random_grid
+import walkways
+from walkways import (
+    build_walk_mask, feature_transform, image_hash, label_components, load_walk_mask,
+    nearest_walkable, same_component, snap_many, snap_norm,
+)
+
+
+def test_walk_mask_is_saved_and_reloaded(temp_cache, monkeypatch):
+    img = map_image(random_grid(np.random.default_rng(1)))
+    built = load_walk_mask(img)
+    assert (built == build_walk_mask(img)).all()
+    assert load_walk_mask(img) is built  # Memory hit
+    assert len(list(temp_cache.glob("walk_*.npy"))) == 1
+
+    # A fresh process (empty memo) reads the file instead of rebuilding
+    monkeypatch.setattr(walkways, "_MASKS", {})
+    monkeypatch.setattr(walkways, "build_walk_mask", lambda *a: pytest.fail("rebuilt"))
+    again = load_walk_mask(img)
+    assert again is not built and (again == built).all()
+
+
+def test_walk_mask_key_includes_thresholds(temp_cache):
+    img = map_image(random_grid(np.random.default_rng(2)))
+    load_walk_mask(img)
+    load_walk_mask(img, val_min=100)
+    load_walk_mask(img, grid_scale=2)
+    assert len(list(temp_cache.glob("walk_*.npy"))) == 3
+    assert (load_walk_mask(img, grid_scale=2) == build_walk_mask(img, 2)).all()
+
+
+def test_in_memory_image_is_hashed_once(monkeypatch):
+    img = map_image(random_grid(np.random.default_rng(3)))
+    same, edited = img.copy(), img.copy()
+    edited.paste((0, 0, 255), (0, 0, 2, 2))
+    digest = image_hash(img)
+    monkeypatch.setattr(img, "tobytes", lambda *a: pytest.fail("hashed again"))
+    assert image_hash(img) == digest
+    assert image_hash(same) == digest  # Same pixels, other object
+    assert image_hash(edited) != digest
+
+
+def bfs_region(mask, start):
+    H, W = mask.shape
+    seen = {start}
+    q = deque([start])
+    while q:
+        x, y = q.popleft()
+        for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            if 0 <= nx < W and 0 <= ny < H and mask[ny, nx] and (nx, ny) not in seen:
+                seen.add((nx, ny))
+                q.append((nx, ny))
+    return seen
+
+
+def test_labels_match_flood_fill():
+    rng = np.random.default_rng(5)
+    for _ in range(30):
+        mask = random_grid(rng)
+        labels = label_components(mask)
+        assert ((labels > 0) == mask).all()
+        ys, xs = np.nonzero(mask)
+        for x, y in list(zip(xs.tolist(), ys.tolist()))[::7]:
+            region = bfs_region(mask, (x, y))
+            same = {(int(a), int(b)) for b, a in np.argwhere(labels == labels[y, x])}
+            assert same == region
+
+
+def test_same_component_off_grid_and_blocked():
+    mask = np.array([[1, 1, 0, 1]], dtype=bool)
+    assert same_component(mask, (0, 0), (1, 0))
+    assert not same_component(mask, (0, 0), (3, 0))
+    assert not same_component(mask, (0, 0), (2, 0))
+    assert not same_component(mask, (0, 0), (9, 0))
+
+
+def nearest_d2(mask, x, y):
+    ys, xs = np.nonzero(mask)
+    return int(((xs - x) ** 2 + (ys - y) ** 2).min())
+
+
+def test_nearest_walkable_is_exact():
+    rng = np.random.default_rng(9)
+    for _ in range(40):
+        mask = rng.random(tuple(int(v) for v in rng.integers(5, 60, 2))) < rng.uniform(0.01, 0.3)
+        if not mask.any():
+            continue
+        H, W = mask.shape
+        for _ in range(10):
+            x, y = int(rng.integers(0, W)), int(rng.integers(0, H))
+            nx, ny = nearest_walkable(mask, (x, y))
+            assert mask[ny, nx]
+            assert (nx - x) ** 2 + (ny - y) ** 2 == nearest_d2(mask, x, y)
+
+
+def test_nearest_walkable_clamps_and_handles_empty():
+    mask = np.zeros((4, 4), dtype=bool)
+    assert nearest_walkable(mask, (2, 2)) == (2, 2)
+    mask[3, 3] = True
+    assert nearest_walkable(mask, (50, 50)) == (3, 3)
+
+
+def test_feature_transform_is_exact(temp_cache):
+    rng = np.random.default_rng(13)
+    for _ in range(20):
+        mask = rng.random(tuple(int(v) for v in rng.integers(5, 50, 2))) < 0.1
+        if not mask.any():
+            continue
+        H, W = mask.shape
+        near = np.asarray(feature_transform(mask))
+        assert near.shape == mask.shape
+        for y in range(H):
+            for x in range(W):
+                i = int(near[y, x])
+                nx, ny = i % W, i // W
+                assert mask[ny, nx]
+                assert (nx - x) ** 2 + (ny - y) ** 2 == nearest_d2(mask, x, y)
+    assert list(temp_cache.glob("near_*.npy"))  # Saved for the next run
+
+
+def test_snap_many_matches_snap_norm(temp_cache):
+    rng = np.random.default_rng(21)
+    mask = rng.random((40, 60)) < 0.05
+    size, gs = (180, 120), 3
+    points = [tuple(p) for p in rng.uniform(-0.1, 1.1, (200, 2)).tolist()]
+    for batch in (points, points[:3]):  # Transform lookups, then one-by-one
+        for p, (x, y) in zip(batch, snap_many(mask, batch, size, gs)):
+            sx, sy = snap_norm(mask, p, size, gs)
+            cx = min(max(int(p[0] * size[0]) // gs, 0), 59)
+            cy = min(max(int(p[1] * size[1]) // gs, 0), 39)
+            assert mask[y, x]
+            assert (x - cx) ** 2 + (y - cy) ** 2 == (sx - cx) ** 2 + (sy - cy) ** 2
@@ -0,0 +1,219 @@
+"""
+Offline z/x/y tile pyramid for the campus map.
+
+Slices the map image into standard 256 px tiles under data/tiles/{z}/{x}/{y}.png
+(or .webp). Zoom MAX_ZOOM - k is the image shrunk 2^k times; zooms above
+it are enlarged. Zoom 0 fits the whole map in one tile.
+
+The build is incremental: manifest.json remembers a hash of the source
+pixels behind every tile, so after a map edit only the tiles whose area
+changed are written again. Tiles are rendered in parallel worker
+processes. The builder also writes tiles.js (manifest plus house pins)
+for campus_map.html, which shows the tiles with the Leaflet copy in
+leaflet/ and needs no network. The Tk viewer reads the same tiles
+through TileStore.
+
+    python tile_builder.py            # build / update
+    python tile_builder.py --format webp --workers 4
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import hashlib
+import json
+import math
+import os
+
+from PIL import Image
+
+from walkways import DATA_DIR, image_hash
+
+TILE = 256
+TILES_DIR = DATA_DIR / "tiles"
+OVERZOOM = 1  # Zoom levels above native resolution (the viewer zooms to 2x)
+
+_WORKER_IMAGE = None
+
+
+# ------------------ Geometry ------------------
+def max_zoom(size) -> int:
+    """Zoom at which the image is shown at native resolution."""
+    return max(0, math.ceil(math.log2(max(size) / TILE)))
+
+
+def zoom_scale(z: int, size) -> float:
+    """Image scale factor at zoom z (1.0 at max_zoom)."""
+    return 2.0 ** (z - max_zoom(size))
+
+
+def tile_range(z: int, size):
+    """Number of tile columns and rows at zoom z."""
+    s = zoom_scale(z, size)
+    return math.ceil(size[0] * s / TILE), math.ceil(size[1] * s / TILE)
+
+
+def source_box(z: int, x: int, y: int, size):
+    """Rectangle of the base image (clipped to it) behind tile z/x/y."""
+    s = zoom_scale(z, size)
+    x0, y0 = x * TILE / s, y * TILE / s
+    return (x0, y0, min(x0 + TILE / s, size[0]), min(y0 + TILE / s, size[1]))
+
+
+# ------------------ Rendering ------------------
+def render_tile(img, z: int, x: int, y: int):
+    """Tile image for z/x/y; edge tiles are padded with transparency."""
+    box = source_box(z, x, y, img.size)
+    s = zoom_scale(z, img.size)
+    w = max(1, round((box[2] - box[0]) * s))
+    h = max(1, round((box[3] - box[1]) * s))
+    part = img.resize((w, h), Image.LANCZOS if s < 1 else Image.BILINEAR, box=box)
+    if (w, h) == (TILE, TILE):
+        return part
+    tile = Image.new("RGBA", (TILE, TILE), (0, 0, 0, 0))
+    tile.paste(part.convert("RGBA"), (0, 0))
+    return tile
+
+
+def source_hash(img, z: int, x: int, y: int) -> str:
+    """Hash of the base-image pixels a tile is rendered from."""
+    box = tuple(int(v) for v in source_box(z, x, y, img.size))
+    box = (box[0], box[1], max(box[2], box[0] + 1), max(box[3], box[1] + 1))
+    return hashlib.sha1(img.crop(box).tobytes()).hexdigest()[:16]
+
+
+def tile_path(root, z: int, x: int, y: int, fmt: str):
+    return root / str(z) / str(x) / f"{y}.{fmt}"
+
+
+def _init_worker(path):
+    global _WORKER_IMAGE
+    _WORKER_IMAGE = Image.open(path)
+    _WORKER_IMAGE.load()
+
+
+def _build_job(job):
+    """Hash one tile's source and write it if it changed; returns (key, hash, written)."""
+    z, x, y, root, fmt, old = job
+    digest = source_hash(_WORKER_IMAGE, z, x, y)
+    path = tile_path(root, z, x, y, fmt)
+    if digest == old and path.exists():
+        return f"{z}/{x}/{y}", digest, False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.stem + f".{os.getpid()}.tmp.{fmt}")
+    tile = render_tile(_WORKER_IMAGE, z, x, y)
+    if fmt == "webp":
+        tile.save(tmp, quality=90)
+    else:
+        tile.save(tmp, optimize=True)
+    os.replace(tmp, path)
+    return f"{z}/{x}/{y}", digest, True
+
+
+# ------------------ Build ------------------
+def build_tiles(image_path, root=TILES_DIR, fmt: str = "png", workers: int = None,
+                overzoom: int = OVERZOOM, markers_norm: dict = None) -> dict:
+    """
+    Build or update the tile pyramid for an image file.
+
+    Returns:
+        dict: The manifest written to root/manifest.json, plus "written"
+            (number of tiles rendered this run).
+    """
+    fmt = fmt.lower()
+    if fmt not in ("png", "webp"):
+        raise ValueError(f"Unsupported tile format: {fmt}")
+    with Image.open(image_path) as img:
+        size = img.size
+        img_hash = image_hash(img)
+
+    manifest_path = root / "manifest.json"
+    try:
+        old = json.loads(manifest_path.read_text(encoding="utf-8"))
+    except Exception:
+        old = {}
+    old_tiles = old.get("tiles", {}) if old.get("format") == fmt and old.get("size") == list(size) else {}
+
+    zmax = max_zoom(size) + overzoom
+    jobs = []
+    for z in range(zmax + 1):
+        cols, rows = tile_range(z, size)
+        for x in range(cols):
+            for y in range(rows):
+                jobs.append((z, x, y, root, fmt, old_tiles.get(f"{z}/{x}/{y}")))
+
+    n = workers or os.cpu_count() or 1
+    if n <= 1:
+        _init_worker(image_path)
+        results = [_build_job(j) for j in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=n, initializer=_init_worker,
+                                 initargs=(str(image_path),)) as pool:
+            results = list(pool.map(_build_job, jobs, chunksize=16))
+
+    manifest = {
+        "image": img_hash[:16], "size": list(size), "tile": TILE, "format": fmt,
+        "min_zoom": 0, "max_zoom": zmax, "native_zoom": max_zoom(size),
+        "tiles": {key: digest for key, digest, _ in results},
+    }
+    root.mkdir(parents=True, exist_ok=True)
+    manifest_path.write_text(json.dumps(manifest), encoding="utf-8")
+
+    # Script form for campus_map.html (file:// pages can't fetch JSON)
+    info = {k: v for k, v in manifest.items() if k != "tiles"}
+    info["markers"] = {k: list(v) for k, v in (markers_norm or {}).items()}
+    (root / "tiles.js").write_text(f"window.CAMPUS_TILES = {json.dumps(info)};\n", encoding="utf-8")
+
+    manifest["written"] = sum(1 for *_, w in results if w)
+    return manifest
+
+
+# ------------------ Viewer Access ------------------
+class TileStore:
+    """Read-only access to a built pyramid that matches a given image."""
+
+    tile = TILE
+
+    def __init__(self, pil_image, root=TILES_DIR):
+        self.root = root
+        self.manifest = None
+        try:
+            m = json.loads((root / "manifest.json").read_text(encoding="utf-8"))
+        except Exception:
+            return
+        if m.get("image") == image_hash(pil_image)[:16] and m.get("tile") == TILE:
+            self.manifest = m
+
+    def zoom_for(self, scale: float):
+        """Zoom whose tiles match a viewer scale exactly, or None."""
+        if self.manifest is None:
+            return None
+        z = self.manifest["native_zoom"] + math.log2(scale)
+        if z != int(z) or not 0 <= z <= self.manifest["max_zoom"]:
+            return None
+        return int(z)
+
+    def open(self, z: int, x: int, y: int):
+        """Tile image from disk, or None if it isn't there."""
+        path = tile_path(self.root, z, x, y, self.manifest["format"])
+        try:
+            with Image.open(path) as img:
+                img.load()
+                return img
+        except OSError:
+            return None
+
+
+if __name__ == "__main__":
+    from utils import find_map_image, load_markers_norm, MAP_PATH
+
+    ap = argparse.ArgumentParser(description="Build the offline z/x/y map tiles.")
+    ap.add_argument("--image", help="map image (default: images/ folder)")
+    ap.add_argument("--format", default="png", choices=["png", "webp"])
+    ap.add_argument("--workers", type=int, default=None, help="processes (default: CPU count)")
+    ap.add_argument("--overzoom", type=int, default=OVERZOOM, help="zoom levels above native")
+    args = ap.parse_args()
+
+    src = args.image or find_map_image() or MAP_PATH
+    m = build_tiles(src, fmt=args.format, workers=args.workers, overzoom=args.overzoom,
+                    markers_norm=load_markers_norm())
+    print(f"{len(m['tiles'])} tiles (z0-{m['max_zoom']}), {m['written']} written -> {TILES_DIR}")
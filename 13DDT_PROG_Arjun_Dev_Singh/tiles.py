@@ -0,0 +1,172 @@
+"""
+Tiled map rendering for the Tk canvas.
+
+Each zoom level is split into TILE x TILE squares. render() only creates
+canvas items for tiles inside the viewport, reuses items for tiles that
+stay visible (they just move), and deletes the rest. pan() shifts the
+existing items with one canvas.move and only calls render() when a tile
+enters or leaves the viewport. Tile PhotoImages live in a bounded LRU, so
+panning back over a tile costs nothing and memory stays flat however
+large the map image is.
+
+While the user is dragging or zooming, render(fast=True) never waits for
+a level: missing tiles are scaled with a cheap filter from the nearest
+level already in memory. A settled render(fast=False) uses the pyramid's
+anchor level for the zoom (see ScalePyramid.anchor) and resamples each
+tile from it with HQ_FILTER; it keeps the preview while that anchor is
+still being built.
+
+If a TileStore from tile_builder.py is given and has tiles for the current
+zoom, tiles are read straight from disk instead of being resized.
+"""
+
+from collections import OrderedDict
+import math
+
+from PIL import Image, ImageTk
+
+TILE = 256        # Tile edge in screen pixels
+MAX_TILES = 192   # PhotoImages kept (about 256 KiB each in Tk)
+FAST_FILTER = Image.NEAREST   # Interactive frames
+HQ_FILTER = Image.LANCZOS     # Settled frames
+
+# Tile quality, best last; a cached tile is reused if it is at least as good
+FAST, RESAMPLED, FINAL = 0, 1, 2
+
+
+class TileRenderer:
+    """Draws the map as a grid of image tiles tagged "tile" on a canvas."""
+
+    def __init__(self, canvas, pyramid, tile: int = TILE, max_tiles: int = MAX_TILES, store=None):
+        self.canvas = canvas
+        self.pyramid = pyramid
+        self.store = store
+        self.tile = tile
+        self.max_tiles = max_tiles
+        self.photos = OrderedDict()  # (scale, tx, ty) -> (PhotoImage, quality)
+        self.items = {}              # (scale, tx, ty) -> canvas item id
+
+    def disk_zoom(self, scale: float):
+        """Zoom of the on-disk pyramid that serves this scale, or None."""
+        if self.store is None or self.tile != self.store.tile:
+            return None
+        return self.store.zoom_for(scale)
+
+    def _photo(self, key, level, zoom=None, fast=False, level_scale=None):
+        """
+        PhotoImage for a tile; rebuilt once a better source is available.
+        None if no pixels are loaded yet (deferred base, no preview).
+        """
+        want = FINAL if (level is not None or zoom is not None) else FAST if fast else RESAMPLED
+        hit = self.photos.get(key)
+        if hit is not None and hit[1] >= want:
+            self.photos.move_to_end(key)
+            return hit[0]
+
+        scale, tx, ty = key
+        w, h = self.pyramid.size_at(scale)
+        x0, y0 = tx * self.tile, ty * self.tile
+        x1, y1 = min(x0 + self.tile, w), min(y0 + self.tile, h)
+        img = self.store.open(zoom, tx, ty) if zoom is not None else None
+        quality = FINAL
+        if img is None and level is not None and level_scale in (None, scale):
+            img = level.crop((x0, y0, x1, y1))
+        elif img is None and level is not None:
+            # Between anchors: resample just this tile from the anchor level
+            f = level_scale / scale
+            img = level.resize((x1 - x0, y1 - y0), HQ_FILTER, box=(x0 * f, y0 * f, x1 * f, y1 * f))
+        elif img is None and fast:
+            # Preview: scale this tile from the closest level we already have
+            near = self.pyramid.nearest(scale)
+            if near is None:
+                return None
+            src_scale, src = near
+            f = src_scale / scale
+            quality = FAST
+            img = src.resize((x1 - x0, y1 - y0), FAST_FILTER, box=(x0 * f, y0 * f, x1 * f, y1 * f))
+        elif img is None:
+            # Level not built yet: resample just this tile from the base image
+            quality = RESAMPLED
+            img = self.pyramid.base.resize(
+                (x1 - x0, y1 - y0), HQ_FILTER, box=(x0 / scale, y0 / scale, x1 / scale, y1 / scale)
+            )
+        photo = ImageTk.PhotoImage(img, master=self.canvas)
+        self.photos[key] = (photo, quality)
+        self.photos.move_to_end(key)
+        return photo
+
+    def _evict(self, visible):
+        """Drop least recently used tiles, never ones on screen."""
+        for key in list(self.photos):
+            if len(self.photos) <= self.max_tiles:
+                break
+            if key not in visible:
+                del self.photos[key]
+
+    def _visible(self, scale, offset_x, offset_y, viewport):
+        """Keys of the tiles of a zoom level that intersect the viewport."""
+        cw, ch = viewport
+        w, h = self.pyramid.size_at(scale)
+        t = self.tile
+        tx0, ty0 = max(0, math.floor(-offset_x / t)), max(0, math.floor(-offset_y / t))
+        tx1 = min(math.ceil(w / t), math.ceil((cw - offset_x) / t))
+        ty1 = min(math.ceil(h / t), math.ceil((ch - offset_y) / t))
+        return {(scale, tx, ty) for ty in range(ty0, ty1) for tx in range(tx0, tx1)}
+
+    def render(self, scale: float, offset_x: int, offset_y: int, viewport, fast: bool = False):
+        """
+        Show the tiles of the given zoom level that intersect the viewport.
+        fast=True resamples missing tiles with FAST_FILTER (for frames
+        drawn while the view is moving).
+
+        Returns:
+            bool: True if every visible tile came from a built pyramid level
+                (or from the on-disk tiles).
+        """
+        t = self.tile
+        zoom = self.disk_zoom(scale)
+        level_scale = scale if zoom is not None else self.pyramid.anchor(scale)
+        level = True if zoom is not None else self.pyramid.get(level_scale, build=not fast)
+        if level is None and self.pyramid.is_pending(level_scale):
+            fast = True  # Level on its way: preview now, the caller redraws when it lands
+        visible = self._visible(scale, offset_x, offset_y, viewport)
+
+        for key in list(self.items):
+            if key not in visible:
+                self.canvas.delete(self.items.pop(key))
+
+        for key in visible:
+            _, tx, ty = key
+            photo = self._photo(key, level if zoom is None else None, zoom, fast, level_scale)
+            if photo is None:
+                continue  # Map still decoding; drawn once the base arrives
+            x, y = offset_x + tx * t, offset_y + ty * t
+            item = self.items.get(key)
+            if item is None:
+                self.items[key] = self.canvas.create_image(x, y, anchor="nw", image=photo, tags=("tile",))
+            else:
+                self.canvas.itemconfigure(item, image=photo)
+                self.canvas.coords(item, x, y)
+
+        self.canvas.tag_lower("tile")
+        self._evict(visible)
+        return level is not None
+
+    def pan(self, dx: int, dy: int, scale: float, offset_x: int, offset_y: int, viewport,
+            fast: bool = False):
+        """
+        Shift the map by (dx, dy); offsets are the values after the move.
+
+        Returns:
+            bool | None: render()'s result if tiles had to change, else None.
+        """
+        self.canvas.move("tile", dx, dy)
+        if self._visible(scale, offset_x, offset_y, viewport) != set(self.items):
+            return self.render(scale, offset_x, offset_y, viewport, fast)
+        return None
+
+    def clear(self):
+        """Remove all tile items and forget cached images."""
+        self.canvas.delete("tile")
+        self.items.clear()
+        self.photos.clear()
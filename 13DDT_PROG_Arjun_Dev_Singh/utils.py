@@ -14,10 +14,15 @@ import re
 import os
 import hashlib
 import hmac
-from collections import deque
-import heapq
 from PIL import Image
 
+from walkways import (
+    label_components, routing_mask, same_component, snap_norm,
+)
+from route_table import lookup_route
+from distance_fields import route_from_house
+from pathfinding import search
+
 # ------------------ Paths ------------------
 BASE_DIR = Path(__file__).resolve().parent
 DATA_DIR = BASE_DIR / "data"
@@ -157,94 +162,119 @@ def raster_route_walkways(
     grid_scale: int = 3,
     sat_max: int = 40,
     val_min: int = 200,
+    use_table: bool = True,
+    engine: str = "astar",
+    diagonal: bool = False,
+    stats: dict = None,
+    cancel=None,
+    epsilon: float = 1.0,
+):
+    """
+    Walkways-only route between two house pins.
+    Known house pairs come straight from the precomputed route table
+    (see route_table.py); on a table miss, a distance field already cached
+    for the start house (see distance_fields.py) answers with a backtrack.
+    Anything else is searched with the chosen engine from
+    pathfinding.ENGINES, honouring stats and cancel. Table and field routes
+    are optimal, so they also satisfy any epsilon bound.
+    """
+    if use_table and engine == "astar" and not diagonal:
+        hit = lookup_route(start_house, end_house, markers_norm, pil_image,
+                           grid_scale, sat_max, val_min)
+        if hit is not None:
+            return hit[0]
+        hit = route_from_house(start_house, markers_norm[end_house], markers_norm,
+                               pil_image, grid_scale, sat_max, val_min, flood=False)
+        if hit is not None:
+            return hit[0]
+    path, _ = raster_route_with_cost(start_house, end_house, markers_norm, pil_image,
+                                     grid_scale, sat_max, val_min, engine, diagonal,
+                                     stats, cancel, epsilon)
+    return path
+
+
+def raster_route_with_cost(
+    start_house: str,
+    end_house: str,
+    markers_norm: dict,
+    pil_image,
+    grid_scale: int = 3,
+    sat_max: int = 40,
+    val_min: int = 200,
+    engine: str = "astar",
+    diagonal: bool = False,
+    stats: dict = None,
+    cancel=None,
+    epsilon: float = 1.0,
 ):
     """
-    Walkways-only route using HSV threshold + A* on a grid.
+    Walkways-only route using HSV threshold + a grid search.
     Starts and ends at exact house pins.
+    The walkable grid comes from the cached mask (see walkways.py),
+    minus any closures.
+
+    Args:
+        engine (str): Search engine name from pathfinding.ENGINES.
+        diagonal (bool): Allow 8-connected moves (octile heuristic).
+        stats (dict): Optional dict that receives search counters.
+        cancel (threading.Event): Optional; set it to abort the search
+            with walkways.RouteCancelled.
+        epsilon (float): Weighted A* factor (>= 1). The route is at most
+            epsilon times the shortest one, for far fewer expansions.
+
+    Returns:
+        tuple: (path, dist) where dist is the walk length in image
+            pixels, or ([], None) if there is no route.
     """
     w0, h0 = pil_image.width, pil_image.height
     ax0, ay0 = markers_norm[start_house]
     bx0, by0 = markers_norm[end_house]
 
-    # Start and end in pixel coordinates
-    sx, sy = int(ax0 * w0), int(ay0 * h0)
-    tx, ty = int(bx0 * w0), int(by0 * h0)
+    mask = routing_mask(pil_image, grid_scale, sat_max, val_min)
 
-    hsv = pil_image.convert("HSV").resize(
-        (max(1, w0 // grid_scale), max(1, h0 // grid_scale))
-    )
-    pix = hsv.load()
-    W, H = hsv.size
+    # Snap start and end to nearest walkable
+    s = snap_norm(mask, (ax0, ay0), (w0, h0), grid_scale)
+    t = snap_norm(mask, (bx0, by0), (w0, h0), grid_scale)
 
-    def walkable(x, y):
-        if not (0 <= x < W and 0 <= y < H):
-            return False
-        h, s, v = pix[x, y]
-        return s < sat_max and v > val_min
+    # Different walkway regions: no search can succeed
+    if s != t and not same_component(mask, s, t):
+        if stats is not None:
+            stats["expanded"] = 0
+        return [], None
 
-    # Snap start and end to nearest walkable
-    def nearest_walk(c):
-        if walkable(*c):
-            return c
-        q = deque([c])
-        seen = {c}
-        while q:
-            x, y = q.popleft()
-            for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
-                nx, ny = x + dx, y + dy
-                if (nx, ny) in seen:
-                    continue
-                if 0 <= nx < W and 0 <= ny < H:
-                    if walkable(nx, ny):
-                        return (nx, ny)
-                    seen.add((nx, ny))
-                    q.append((nx, ny))
-        return c
-
-    s = nearest_walk((sx // grid_scale, sy // grid_scale))
-    t = nearest_walk((tx // grid_scale, ty // grid_scale))
-
-    # A* pathfinding
-    def h(a, b):
-        return abs(a[0] - b[0]) + abs(a[1] - b[1])
-
-    frontier = [(0, s)]
-    came = {s: None}
-    g = {s: 0}
-
-    while frontier:
-        _, u = heapq.heappop(frontier)
-        if u == t:
-            break
-        x, y = u
-        for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
-            v = (x + dx, y + dy)
-            if not walkable(*v):
-                continue
-            nv = g[u] + 1
-            if v not in g or nv < g[v]:
-                g[v] = nv
-                came[v] = u
-                heapq.heappush(frontier, (nv + h(v, t), v))
-
-    # Reconstruct path
-    if t not in came and t != s:
-        return []
-
-    path = []
-    cur = t
-    while cur is not None:
-        px, py = cur[0] * grid_scale, cur[1] * grid_scale
-        path.append((px / w0, py / h0))
-        cur = came.get(cur)
-    path.reverse()
-
-    if path:
-        path[0] = (ax0, ay0)
-        path[-1] = (bx0, by0)
-    else:
-        path = [(ax0, ay0), (bx0, by0)]
-    return path
+    cells, cost = search(mask, s, t, engine, diagonal, stats, cancel, epsilon)
+    if not cells:
+        return [], None
+
+    path = [(x * grid_scale / w0, y * grid_scale / h0) for x, y in cells]
+    path[0] = (ax0, ay0)
+    path[-1] = (bx0, by0)
+    return path, cost * grid_scale
+
+
+def house_components(
+    markers_norm: dict,
+    pil_image,
+    grid_scale: int = 3,
+    sat_max: int = 40,
+    val_min: int = 200,
+) -> dict:
+    """Walkway region label of each house pin's snapped cell (0 = none)."""
+    mask = routing_mask(pil_image, grid_scale, sat_max, val_min)
+    labels = label_components(mask)
+    H, W = mask.shape
+    out = {}
+    for name, pt in markers_norm.items():
+        x, y = snap_norm(mask, pt, pil_image.size, grid_scale)
+        out[name] = int(labels[y, x]) if 0 <= x < W and 0 <= y < H else 0
+    return out
+
+
+def unreachable_from(house: str, markers_norm: dict, pil_image, **kwargs) -> list:
+    """Houses that no walkway connects to the given house."""
+    comp = house_components(markers_norm, pil_image, **kwargs)
+    here = comp.get(house, 0)
+    return sorted(n for n, c in comp.items() if n != house and (not here or c != here))
 
 
 # ------------------ Password Hashing ------------------
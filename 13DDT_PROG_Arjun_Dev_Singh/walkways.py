@@ -0,0 +1,486 @@
+"""
+Walkway mask handling for the campus router.
+
+The walkable grid (HSV threshold on the resized map) is built once per
+(image hash, grid_scale, sat_max, val_min), kept in memory and saved as a
+.npy file under data/cache so later runs can skip the HSV conversion.
+Closures (polygons in data/closures.json) are cut out of that grid by
+apply_closures, so construction work never needs a map edit.
+"""
+
+from collections import OrderedDict
+from pathlib import Path
+import hashlib
+import json
+import os
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+# Base directory and cache folder (next to markers.json)
+BASE_DIR = Path(__file__).resolve().parent
+DATA_DIR = BASE_DIR / "data"
+CACHE_DIR = DATA_DIR / "cache"
+CLOSURES_PATH = DATA_DIR / "closures.json"
+
+# In-memory caches
+_HASHES = {}  # (path, size, mtime) -> sha1 of file bytes
+_MASKS = {}   # (image hash, grid_scale, sat_max, val_min) -> bool array
+# Per-mask results, keyed by id(mask) and checked by identity; each keeps
+# only the MEMO_MAX most recently used masks
+_LABELS = OrderedDict()  # id(mask) -> (mask, int32 component labels)
+_EDTS = OrderedDict()    # id(mask) -> (mask, int32 nearest walkable cell)
+_CLOSED = OrderedDict()  # (id(mask), closures digest) -> (mask, mask with closures cut out)
+_IMAGES = OrderedDict()  # id(image) -> (image, sha1 of pixels), for images not read from a file
+MEMO_MAX = 4
+
+CHECK_EVERY = 4096  # search expansions between cancel/progress checkpoints
+SNAP_MANY_MIN = 32  # Points from which snap_many builds the feature transform
+
+
+# ------------------ Image Hash ------------------
+def image_hash(pil_image) -> str:
+    """
+    Return a content hash for a map image.
+
+    Images opened from disk are hashed by file bytes (memoised on path,
+    size and mtime); in-memory images are hashed by their pixel data
+    (memoised per image object, so don't draw on an image after routing
+    on it; route on a copy instead).
+    """
+    path = getattr(pil_image, "filename", "")
+    if path and os.path.exists(path):
+        st = os.stat(path)
+        key = (str(path), st.st_size, st.st_mtime_ns)
+        if key not in _HASHES:
+            _HASHES[key] = hashlib.sha1(Path(path).read_bytes()).hexdigest()
+        return _HASHES[key]
+    hit = _memo_get(_IMAGES, pil_image)
+    if hit is not None:
+        return hit
+    h = hashlib.sha1(f"{pil_image.mode}{pil_image.size}".encode("utf-8"))
+    h.update(pil_image.tobytes())
+    _memo_put(_IMAGES, pil_image, h.hexdigest())
+    return h.hexdigest()
+
+
+def mask_cells(mask):
+    """
+    Flat byte view of a mask (one byte per cell, row-major). Indexes as
+    fast as bytes but shares the mask's memory, so a memory-mapped mask is
+    never copied (only a non-contiguous view is).
+    """
+    return memoryview(np.ascontiguousarray(mask)).cast("B")
+
+
+def mask_digest(mask) -> str:
+    """Content hash of a mask, for caches derived from it."""
+    h = hashlib.sha1(str(mask.shape).encode("utf-8"))
+    h.update(mask_cells(mask))
+    return h.hexdigest()
+
+
+def _memo_get(memo, mask, key=None):
+    """Cached value for a mask (or None), refreshing its LRU position."""
+    key = id(mask) if key is None else key
+    hit = memo.get(key)
+    if hit is None or hit[0] is not mask:
+        return None
+    memo.move_to_end(key)
+    return hit[1]
+
+
+def _memo_put(memo, mask, value, key=None):
+    """Store a value for a mask, dropping the least recently used beyond MEMO_MAX."""
+    memo[id(mask) if key is None else key] = (mask, value)
+    while len(memo) > MEMO_MAX:
+        memo.popitem(last=False)
+
+
+# ------------------ Search Control ------------------
+class RouteCancelled(Exception):
+    """Raised inside a search engine when its cancel event is set."""
+
+
+def checkpoint(cancel, stats, expanded: int):
+    """
+    Called by search engines every few thousand expansions: publishes
+    progress into stats and stops the search if cancel has been set.
+    """
+    if stats is not None:
+        stats["expanded"] = expanded
+    if cancel is not None and cancel.is_set():
+        raise RouteCancelled()
+
+
+# ------------------ Mask Build/Load ------------------
+def build_walk_mask(pil_image, grid_scale: int = 3, sat_max: int = 40, val_min: int = 200):
+    """
+    Build the walkable grid for an image.
+
+    Returns:
+        np.ndarray: bool array of shape (H, W), indexed mask[y, x].
+    """
+    w0, h0 = pil_image.width, pil_image.height
+    hsv = pil_image.convert("HSV").resize(
+        (max(1, w0 // grid_scale), max(1, h0 // grid_scale))
+    )
+    a = np.asarray(hsv)
+    return (a[..., 1] < sat_max) & (a[..., 2] > val_min)
+
+
+def mask_path(img_hash: str, grid_scale: int, sat_max: int, val_min: int) -> Path:
+    """Path of the cached mask file for the given key."""
+    return CACHE_DIR / f"walk_{img_hash[:16]}_g{grid_scale}_s{sat_max}_v{val_min}.npy"
+
+
+def load_walk_mask(pil_image, grid_scale: int = 3, sat_max: int = 40, val_min: int = 200):
+    """
+    Get the walkable grid for an image, building it only if needed.
+
+    Looks in memory first, then in data/cache, and finally builds the
+    mask and saves it for next time.
+    """
+    key = (image_hash(pil_image), grid_scale, sat_max, val_min)
+    mask = _MASKS.get(key)
+    if mask is not None:
+        return mask
+
+    path = mask_path(*key)
+    try:
+        mask = np.load(path)
+    except Exception:
+        mask = None
+
+    if mask is None or mask.dtype != bool or mask.ndim != 2:
+        mask = build_walk_mask(pil_image, grid_scale, sat_max, val_min)
+        try:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            # Write to a temp file first so readers never see a partial mask
+            tmp = path.with_name(path.stem + f".{os.getpid()}.tmp.npy")
+            np.save(tmp, mask)
+            os.replace(tmp, path)
+        except OSError:
+            pass  # Cache is optional; routing still works from memory
+
+    _MASKS[key] = mask
+    return mask
+
+
+# ------------------ Closures ------------------
+def load_closures():
+    """Load walkway closures ({name: [(x, y), ...]} normalized polygons), fallback to none."""
+    if CLOSURES_PATH.exists():
+        try:
+            data = json.loads(CLOSURES_PATH.read_text(encoding="utf-8"))
+            if data.get("_format") == "norm":
+                return {k: [tuple(p) for p in v] for k, v in data["closures"].items()}
+        except Exception:
+            pass
+    return {}
+
+
+def save_closures(closures: dict):
+    """Save walkway closures to JSON (next to markers.json)."""
+    DATA_DIR.mkdir(exist_ok=True)
+    CLOSURES_PATH.write_text(
+        json.dumps({"_format": "norm", "closures": {k: [list(p) for p in v] for k, v in closures.items()}},
+                   indent=2),
+        encoding="utf-8",
+    )
+
+
+def closures_digest(closures: dict) -> str:
+    """Stable hash of a closures dict ({name: [(x, y), ...]} normalized)."""
+    raw = json.dumps({k: [list(p) for p in v] for k, v in sorted(closures.items())})
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def closed_cells(closures: dict, shape, image_size, grid_scale: int):
+    """
+    Rasterise closure polygons onto the walkway grid.
+
+    Returns:
+        np.ndarray: bool array of shape `shape`, True where a polygon
+            covers (or touches) a cell.
+    """
+    H, W = shape
+    w0, h0 = image_size
+    img = Image.new("1", (W, H), 0)
+    draw = ImageDraw.Draw(img)
+    for pts in closures.values():
+        if len(pts) >= 3:
+            draw.polygon([(x * w0 / grid_scale, y * h0 / grid_scale) for x, y in pts],
+                         fill=1, outline=1)
+    return np.array(img, dtype=bool)
+
+
+def apply_closures(mask, closures: dict, image_size, grid_scale: int):
+    """
+    Walkable grid with closed areas removed. The result is memoised, so
+    repeated calls return the same array (and per-mask caches keep working).
+    """
+    if not closures:
+        return mask
+    key = (id(mask), closures_digest(closures))
+    hit = _memo_get(_CLOSED, mask, key)
+    if hit is not None:
+        return hit
+    closed = mask & ~closed_cells(closures, mask.shape, image_size, grid_scale)
+    _memo_put(_CLOSED, mask, closed, key)
+    return closed
+
+
+def routing_mask(pil_image, grid_scale: int = 3, sat_max: int = 40, val_min: int = 200,
+                 closures: dict = None):
+    """Walkable grid with the current closures (closures.json) cut out."""
+    mask = load_walk_mask(pil_image, grid_scale, sat_max, val_min)
+    if closures is None:
+        closures = load_closures()
+    return apply_closures(mask, closures, pil_image.size, grid_scale)
+
+
+# ------------------ Snapping ------------------
+def _envelope_rows(f):
+    """
+    1-D squared distance transform of every row of f at once (Felzenszwalb
+    & Huttenlocher lower envelope of parabolas). f holds squared column
+    distances, inf where a column has no walkable cell.
+
+    Returns:
+        np.ndarray: int32 column of the nearest site per cell, -1 if the
+            row has no finite sites.
+    """
+    H, W = f.shape
+    r = np.arange(H)
+    k = np.full(H, -1)                       # Index of the last parabola per row
+    v = np.zeros((H, W), dtype=np.int64)     # Parabola sites (columns)
+    z = np.full((H, W + 1), np.inf)          # Boundaries between parabolas
+    fq = f + np.arange(W, dtype=np.float64) ** 2
+
+    for q in range(W):
+        act = np.flatnonzero(np.isfinite(f[:, q]))
+        if not act.size:
+            continue
+        s = np.full(act.size, -np.inf)
+        todo = np.ones(act.size, dtype=bool)
+        while True:
+            rows = act[todo]
+            has = k[rows] >= 0
+            rows, idx = rows[has], np.flatnonzero(todo)[has]
+            if not rows.size:
+                break
+            vk = v[rows, k[rows]]
+            s_new = (fq[rows, q] - fq[rows, vk]) / (2.0 * (q - vk))
+            pop = s_new <= z[rows, k[rows]]
+            s[idx] = s_new
+            k[rows[pop]] -= 1
+            todo[:] = False
+            todo[idx[pop]] = True
+        k[act] += 1
+        v[act, k[act]] = q
+        z[act, k[act]] = np.where(k[act] == 0, -np.inf, s)
+        z[act, k[act] + 1] = np.inf
+
+    near = np.full((H, W), -1, dtype=np.int32)
+    has = k >= 0
+    kk = np.zeros(H, dtype=np.int64)
+    for x in range(W):
+        while True:
+            adv = has & (z[r, kk + 1] < x)
+            if not adv.any():
+                break
+            kk[adv] += 1
+        near[has, x] = v[has, kk[has]]
+    return near
+
+
+def feature_path(mask) -> Path:
+    """Cache file for a mask's nearest-walkable-cell map."""
+    return CACHE_DIR / f"near_{mask_digest(mask)[:16]}.npy"
+
+
+def feature_transform(mask):
+    """
+    Nearest walkable cell (exact Euclidean) for every cell of a mask, as
+    flat indices y * W + x into the mask (-1 everywhere if nothing is
+    walkable). Linear time: a column pass, then a lower-envelope pass per
+    row. Memoised and saved to data/cache, keyed by the mask's content.
+
+    Backs snap_many, for snapping many points at once (e.g. every room
+    code); single pins use nearest_walkable, which never needs the whole
+    transform.
+    """
+    hit = _memo_get(_EDTS, mask)
+    if hit is not None:
+        return hit
+
+    path = feature_path(mask)
+    try:
+        near = np.load(path, mmap_mode="r")
+        if near.shape != mask.shape:
+            near = None
+    except Exception:
+        near = None
+
+    if near is None:
+        # The envelope pass loops over columns, so run it along the short side
+        m = mask.T if mask.shape[0] < mask.shape[1] else mask
+        H, W = m.shape
+        rows = np.arange(H)[:, None]
+        # Column pass: nearest walkable row in each column
+        above = np.maximum.accumulate(np.where(m, rows, -1), axis=0)
+        below = np.minimum.accumulate(np.where(m, rows, H)[::-1], axis=0)[::-1]
+        da = np.where(above >= 0, rows - above, np.inf)
+        db = np.where(below < H, below - rows, np.inf)
+        col_row = np.where(da <= db, above, below)
+        # Row pass: best column for each cell
+        near_c = _envelope_rows(np.minimum(da, db) ** 2)
+        safe_c = np.maximum(near_c, 0)
+        near_r = np.take_along_axis(col_row, safe_c, axis=1)
+        if m is mask:
+            near = np.where(near_c >= 0, near_r * W + safe_c, -1).astype(np.int32)
+        else:
+            near = np.where(near_c >= 0, safe_c * H + near_r, -1).astype(np.int32).T
+        try:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(path.stem + f".{os.getpid()}.tmp.npy")
+            np.save(tmp, near)
+            os.replace(tmp, path)
+        except OSError:
+            pass  # Cache is optional
+
+    _memo_put(_EDTS, mask, near)
+    return near
+
+
+def nearest_walkable(mask, cell):
+    """
+    Snap a grid cell (x, y) to the nearest walkable cell (exact Euclidean,
+    ties to the lowest row then column). Searches a square window that
+    doubles until the best cell found lies inside it, so the cost depends
+    on how far the pin is from a walkway, not on the grid size. Cells off
+    the grid are clamped onto it first. Returns the cell unchanged if the
+    mask has no walkable cells.
+    """
+    H, W = mask.shape
+    x, y = cell
+    if 0 <= x < W and 0 <= y < H and mask[y, x]:
+        return cell
+    x, y = min(max(x, 0), W - 1), min(max(y, 0), H - 1)
+    r = 8
+    while True:
+        x0, y0 = max(0, x - r), max(0, y - r)
+        x1, y1 = min(W, x + r + 1), min(H, y + r + 1)
+        ys, xs = np.nonzero(mask[y0:y1, x0:x1])
+        whole = x0 == 0 and y0 == 0 and x1 == W and y1 == H
+        if ys.size:
+            d2 = (xs + x0 - x) ** 2 + (ys + y0 - y) ** 2
+            i = int(np.argmin(d2))  # nonzero is row-major, so ties go to the lowest row
+            if d2[i] <= r * r or whole:
+                return (int(xs[i] + x0), int(ys[i] + y0))
+        elif whole:
+            return cell
+        r *= 2
+
+
+def snap_norm(mask, point_norm, image_size, grid_scale: int):
+    """Snap a normalized map point to its nearest walkable grid cell."""
+    w0, h0 = image_size
+    xn, yn = point_norm
+    return nearest_walkable(mask, (int(xn * w0) // grid_scale, int(yn * h0) // grid_scale))
+
+
+def snap_many(mask, points_norm, image_size, grid_scale: int):
+    """
+    Snap many normalized points at once, one feature_transform lookup per
+    point. Gives the same cells as snap_norm (up to equally near ties).
+    A few points on a mask whose transform isn't cached yet are snapped
+    one by one instead, which is cheaper than building the transform.
+
+    Returns:
+        list: (x, y) grid cell per point, in order.
+    """
+    points_norm = list(points_norm)
+    if len(points_norm) < SNAP_MANY_MIN and _memo_get(_EDTS, mask) is None \
+            and not feature_path(mask).exists():
+        return [snap_norm(mask, p, image_size, grid_scale) for p in points_norm]
+
+    H, W = mask.shape
+    w0, h0 = image_size
+    pts = np.asarray(points_norm, dtype=float).reshape(-1, 2)
+    xs = (pts[:, 0] * w0).astype(np.int64) // grid_scale
+    ys = (pts[:, 1] * h0).astype(np.int64) // grid_scale
+    near = np.asarray(feature_transform(mask))[np.clip(ys, 0, H - 1), np.clip(xs, 0, W - 1)]
+    return [(int(n % W), int(n // W)) if n >= 0 else (int(x), int(y))
+            for n, x, y in zip(near, xs, ys)]
+
+
+# ------------------ Connected Components ------------------
+def label_components(mask):
+    """
+    Label the 4-connected walkable regions of a mask.
+
+    Works on horizontal runs of walkable cells: runs that overlap the run
+    above are merged with union-find, then each run is painted with its
+    region number.
+
+    Returns:
+        np.ndarray: int32 labels shaped like mask; 0 = not walkable,
+            1..n = region number.
+    """
+    hit = _memo_get(_LABELS, mask)
+    if hit is not None:
+        return hit
+
+    H, W = mask.shape
+    edges = np.diff(np.pad(mask.astype(np.int8), ((0, 0), (1, 1))), axis=1)
+    starts = np.argwhere(edges == 1)   # (row, first col), row-major order
+    ends = np.argwhere(edges == -1)    # (row, end col, exclusive)
+    rows = starts[:, 0]
+    x0, x1 = starts[:, 1].tolist(), ends[:, 1].tolist()
+    first = np.searchsorted(rows, np.arange(H + 1)).tolist()
+
+    parent = list(range(len(x0)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    # Merge each run with the overlapping runs of the row above
+    for y in range(1, H):
+        i, i_end = first[y - 1], first[y]
+        j, j_end = first[y], first[y + 1]
+        while i < i_end and j < j_end:
+            if x0[i] < x1[j] and x0[j] < x1[i]:
+                ri, rj = find(i), find(j)
+                if ri != rj:
+                    parent[rj] = ri
+            if x1[i] < x1[j]:
+                i += 1
+            else:
+                j += 1
+
+    labels = np.zeros(H * W, dtype=np.int32)
+    if parent:
+        _, run_label = np.unique([find(i) for i in range(len(parent))], return_inverse=True)
+        lengths = ends[:, 1] - starts[:, 1]
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        cells = np.repeat(rows * W + starts[:, 1], lengths) + offsets
+        labels[cells] = np.repeat(run_label.astype(np.int32) + 1, lengths)
+    labels = labels.reshape(H, W)
+
+    _memo_put(_LABELS, mask, labels)
+    return labels
+
+
+def same_component(mask, a, b) -> bool:
+    """True if cells a and b are in the same walkable region."""
+    labels = label_components(mask)
+    H, W = mask.shape
+    if not all(0 <= c[0] < W and 0 <= c[1] < H for c in (a, b)):
+        return False
+    la, lb = labels[a[1], a[0]], labels[b[1], b[0]]
+    return bool(la) and la == lb